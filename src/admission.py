@@ -0,0 +1,112 @@
+import time
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator
+
+from fastapi.responses import JSONResponse
+
+from exceptions import ServiceOverloaded
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int,
+                 queue_timeout: float, retry_after: int):
+        """
+        Limits the number of requests of an endpoint processed at once. Extra
+        requests wait in a bounded queue and are rejected straight away when
+        the queue is full (429) or when they wait too long (503).
+
+        Args:
+            name (str): endpoint name used in metrics
+            max_concurrency (int): max. number of requests processed at once
+            max_queue (int): max. number of requests waiting for a slot
+            queue_timeout (float): max. number of seconds a request waits
+            retry_after (int): Retry-After value of rejected requests, in seconds
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.n_active = 0
+        self.n_waiting = 0
+        self.n_admitted = 0
+        self.n_queued = 0
+        self.n_rejected_queue_full = 0
+        self.n_rejected_timeout = 0
+        self.max_queue_depth = 0
+        self.total_wait_time = 0.0
+
+    async def acquire(self):
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()  # a slot is free, returns without waiting
+        else:
+            await self._wait_for_slot()
+
+        self.n_active += 1
+        self.n_admitted += 1
+
+    async def _wait_for_slot(self):
+        if self.n_waiting >= self.max_queue:
+            self.n_rejected_queue_full += 1
+            raise ServiceOverloaded(f"Too many {self.name} requests, try again later",
+                                    status_code=429, retry_after=self.retry_after)
+
+        self.n_waiting += 1
+        self.n_queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.n_waiting)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.n_rejected_timeout += 1
+            raise ServiceOverloaded(f"Service overloaded with {self.name} requests, try again later",
+                                    status_code=503, retry_after=self.retry_after)
+        finally:
+            self.n_waiting -= 1
+            self.total_wait_time += time.perf_counter() - start
+
+    def release(self):
+        self.n_active -= 1
+        self._semaphore.release()
+
+    @contextlib.asynccontextmanager
+    async def admit(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def release_after(self, iterator: AsyncIterator) -> AsyncIterator:
+        """
+        Passes through a streamed response body and releases the slot of
+        an already admitted request once it is finished
+        """
+        try:
+            async for item in iterator:
+                yield item
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.n_active,
+            "queue_depth": self.n_waiting,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.n_admitted,
+            "queued": self.n_queued,
+            "rejected_queue_full": self.n_rejected_queue_full,
+            "rejected_timeout": self.n_rejected_timeout,
+            "avg_wait_ms": (round(1000 * self.total_wait_time / self.n_queued, 3)
+                            if self.n_queued else 0.0),
+        }
+
+
+def overloaded_response(e: ServiceOverloaded) -> JSONResponse:
+    return JSONResponse(status_code=e.status_code, content={"message": str(e)},
+                        headers={"Retry-After": str(e.retry_after)})
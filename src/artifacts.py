@@ -0,0 +1,120 @@
+"""
+Pickle-free model artifacts: a directory with a JSON manifest holding the
+fitted preprocessing parameters and one .npy file per forest node array.
+Arrays are loaded with `np.load(mmap_mode="r")`, so all processes loading
+the same artifact share its pages through the OS page cache.
+
+Usage (from src/):
+    python artifacts.py apartments ../artifacts/apartments
+"""
+import os
+import json
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from forest import CompiledForest, CompiledPipeline
+from features import FeatureVectorizer
+from exceptions import InvalidArtifact
+
+
+ARTIFACT_FORMAT = "rea-forest"
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+FOREST_ARRAYS = ["feature", "threshold", "children_left", "children_right",
+                 "value", "missing_go_to_left", "roots", "is_leaf"]
+
+
+def export_artifact(pipeline, path: str, metadata: dict = None):
+    """
+    Stores a fitted sklearn forest pipeline as an artifact directory.
+    An existing artifact under `path` is replaced.
+
+    Args:
+        pipeline: fitted pipeline (column transformer, scaler, forest)
+        path (str): artifact directory
+        metadata (dict): additional information stored in the manifest
+    """
+    vectorizer = FeatureVectorizer.from_pipeline(pipeline)
+    forest = CompiledForest.from_estimator(pipeline[-1])
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "metadata": metadata or {},
+        "vectorizer": vectorizer.to_dict(),
+        "forest": {"n_trees": forest.n_trees, "n_nodes": forest.n_nodes,
+                   "arrays": FOREST_ARRAYS},
+    }
+
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=".artifact-", dir=os.path.dirname(path))
+    try:
+        for name in FOREST_ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"),
+                    np.ascontiguousarray(getattr(forest, name)))
+        with open(os.path.join(tmp_path, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f)
+
+        if os.path.exists(path):
+            old_path = tempfile.mkdtemp(prefix=".artifact-old-", dir=os.path.dirname(path))
+            os.replace(path, os.path.join(old_path, "artifact"))
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path)
+        else:
+            os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def read_manifest(path: str) -> dict:
+    try:
+        with open(os.path.join(path, MANIFEST_NAME), "r") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise InvalidArtifact(f"Cannot read artifact manifest from {path}: {e}")
+
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise InvalidArtifact(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+    if manifest.get("version") != ARTIFACT_VERSION:
+        raise InvalidArtifact(f"Unsupported artifact version {manifest.get('version')},"
+                              f" expected {ARTIFACT_VERSION}")
+    return manifest
+
+
+def load_artifact(path: str, mmap_mode: str | None = "r") -> CompiledPipeline:
+    """
+    Loads an artifact directory as a CompiledPipeline
+
+    Args:
+        path (str): artifact directory
+        mmap_mode (str | None): passed to `np.load`, None reads arrays to memory
+
+    Returns:
+        (CompiledPipeline): model ready for prediction
+    """
+    manifest = read_manifest(path)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+              for name in manifest["forest"]["arrays"]}
+
+    if len(arrays["feature"]) != manifest["forest"]["n_nodes"]:
+        raise InvalidArtifact(f"Artifact {path} has inconsistent node arrays")
+
+    return CompiledPipeline(
+        preprocessor=FeatureVectorizer.from_dict(manifest["vectorizer"]),
+        forest=CompiledForest(**arrays))
+
+
+if __name__ == "__main__":
+    from utl import load_model
+
+    parser = argparse.ArgumentParser(description="Export a pickled model as an artifact")
+    parser.add_argument("property_type", choices=["apartments", "houses", "lands"])
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    export_artifact(load_model(args.property_type), args.path,
+                    metadata={"property_type": args.property_type})
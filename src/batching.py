@@ -0,0 +1,148 @@
+import time
+import asyncio
+from collections.abc import Awaitable, Callable
+
+
+class BatchingStats:
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+    def __init__(self):
+        self.n_requests = 0
+        self.n_batches = 0
+        self.n_failed_batches = 0
+        self.batch_size_counts = dict.fromkeys(self.BATCH_SIZE_BUCKETS + ("+Inf",), 0)
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def record_batch(self, batch_size: int, wait_times: list[float]):
+        self.n_requests += batch_size
+        self.n_batches += 1
+        bucket = next((b for b in self.BATCH_SIZE_BUCKETS if batch_size <= b), "+Inf")
+        self.batch_size_counts[bucket] += 1
+        self.total_wait_time += sum(wait_times)
+        self.max_wait_time = max(self.max_wait_time, *wait_times)
+
+    @property
+    def avg_batch_size(self):
+        return self.n_requests / self.n_batches if self.n_batches else 0.0
+
+    @property
+    def avg_wait_time(self):
+        return self.total_wait_time / self.n_requests if self.n_requests else 0.0
+
+    def to_dict(self):
+        return {
+            "n_requests": self.n_requests,
+            "n_batches": self.n_batches,
+            "n_failed_batches": self.n_failed_batches,
+            "avg_batch_size": round(self.avg_batch_size, 3),
+            "batch_size_counts": {str(k): v for k, v in self.batch_size_counts.items()},
+            "avg_wait_ms": round(1000 * self.avg_wait_time, 3),
+            "max_wait_ms": round(1000 * self.max_wait_time, 3),
+        }
+
+
+class PredictionBatcher:
+    def __init__(self,
+                 predict_fn: Callable[[list[dict]], Awaitable[list[float]]],
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5,
+                 flush_when_idle: bool = True):
+        """
+        Coalesces concurrent single-offer predictions into batched calls.
+        If a batch fails, its records are predicted one by one, so a faulty
+        record fails only its own request.
+
+        Args:
+            predict_fn (Callable): coroutine function estimating prices
+                                   of a list of records
+            max_batch_size (int): batch is flushed once it reaches this size
+            max_wait_ms (float): batch is flushed once its oldest request
+                                 waited that long
+            flush_when_idle (bool): flush immediately when no batch is being
+                                    predicted, so a single request under low
+                                    load does not wait for the window to close
+        """
+        self._predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.flush_when_idle = flush_when_idle
+
+        self._pending = []
+        self._flush_handle = None
+        self._n_in_flight = 0
+        self._tasks = set()
+        self.stats = BatchingStats()
+
+    async def predict(self, record: dict) -> float:
+        """
+        Enqueues a single record and waits for its price estimate
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future, time.perf_counter()))
+
+        if (len(self._pending) >= self.max_batch_size
+                or (self.flush_when_idle and not self._n_in_flight)):
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000,
+                                                 self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        self._n_in_flight += 1
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[tuple]):
+        flushed_at = time.perf_counter()
+        records = [record for record, _, _ in batch]
+        self.stats.record_batch(len(batch), [flushed_at - enqueued_at
+                                             for _, _, enqueued_at in batch])
+        try:
+            try:
+                prices = await self._predict_fn(records)
+                if len(prices) != len(records):
+                    raise RuntimeError(f"Got {len(prices)} prices for {len(records)} records")
+            except Exception as e:
+                self.stats.n_failed_batches += 1
+                if len(batch) == 1:
+                    prices = [e]
+                else:
+                    # Predict records one by one, so only the faulty ones fail
+                    prices = [await self._predict_single(record) for record in records]
+
+            for (_, future, _), price in zip(batch, prices):
+                if future.done():
+                    continue
+                if isinstance(price, Exception):
+                    future.set_exception(price)
+                else:
+                    future.set_result(price)
+        finally:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Batch prediction ended without a price"))
+            self._n_in_flight -= 1
+            if self._pending and self.flush_when_idle and not self._n_in_flight:
+                self._flush()
+
+    async def _predict_single(self, record: dict) -> float | Exception:
+        try:
+            prices = await self._predict_fn([record])
+            if len(prices) != 1:
+                raise RuntimeError(f"Got {len(prices)} prices for 1 record")
+            return prices[0]
+        except Exception as e:
+            return e
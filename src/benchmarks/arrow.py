@@ -0,0 +1,68 @@
+"""
+Compares scoring through the Arrow IPC path (decode stream, convert columns,
+transform_columns) with the JSON batch path (decode JSON, validate items,
+transform_records) and checks that both give the same prices.
+
+Usage (from src/):
+    python -m benchmarks.arrow --n-rows 10000 100000
+"""
+import json
+import time
+import argparse
+
+import numpy as np
+import pyarrow as pa
+
+from models import PROPERTY_MODELS
+from prediction import predict_batch, predict_columns
+from columnar import read_arrow_stream, write_arrow_stream, table_to_columns, prices_to_arrow_stream
+from benchmarks.synthetic import make_records, fit_pipeline
+
+
+def score_json(pipeline, body: bytes, property_type: str) -> bytes:
+    results = predict_batch(pipeline, json.loads(body), PROPERTY_MODELS[property_type])
+    return json.dumps({"results": results}).encode()
+
+
+def score_arrow(pipeline, body: bytes, property_type: str) -> bytes:
+    columns = table_to_columns(read_arrow_stream(body), PROPERTY_MODELS[property_type])
+    return prices_to_arrow_stream(predict_columns(pipeline, columns))
+
+
+def best_time(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for property_type in ["apartments", "houses", "lands"]:
+        pipeline = fit_pipeline(property_type, n_samples=2000, n_estimators=50, max_depth=15)
+
+        for n_rows in args.n_rows:
+            records = make_records(property_type, n_rows, seed=4)
+            json_body = json.dumps(records, default=str).encode()
+            arrow_body = write_arrow_stream(pa.Table.from_pylist(records))
+
+            json_prices = [r["result"] for r in json.loads(score_json(pipeline, json_body, property_type))["results"]]
+            arrow_prices = read_arrow_stream(score_arrow(pipeline, arrow_body, property_type)).column("result").to_numpy()
+            if not np.allclose(json_prices, arrow_prices, rtol=1e-12):
+                raise AssertionError(f"{property_type}: Arrow and JSON prices differ")
+
+            json_time = best_time(lambda: score_json(pipeline, json_body, property_type), args.repeat)
+            arrow_time = best_time(lambda: score_arrow(pipeline, arrow_body, property_type), args.repeat)
+            print(f"{property_type:>10} {n_rows:>7} rows: json {1e3 * json_time:8.1f} ms"
+                  f" ({len(json_body) / 2**20:6.1f} MiB), arrow {1e3 * arrow_time:7.1f} ms"
+                  f" ({len(arrow_body) / 2**20:5.1f} MiB), {json_time / arrow_time:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
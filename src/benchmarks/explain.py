@@ -0,0 +1,50 @@
+"""
+Checks that feature contributions computed by CompiledForest add up to the
+forest prediction and compares their cost with a plain prediction.
+
+Usage (from src/):
+    python -m benchmarks.explain --n-estimators 900 --max-depth 140
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from prediction import get_vectorizer, get_compiled_forest
+from benchmarks.synthetic import make_records, fit_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--property-type", default="apartments")
+    parser.add_argument("--n-samples", type=int, default=5000)
+    parser.add_argument("--n-estimators", type=int, default=900)
+    parser.add_argument("--max-depth", type=int, default=140)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pipeline = fit_pipeline(args.property_type, args.n_samples,
+                            args.n_estimators, args.max_depth)
+    vectorizer = get_vectorizer(pipeline)
+    forest = get_compiled_forest(pipeline)
+
+    for n_rows in [1, 32]:
+        X = vectorizer.transform_records(make_records(args.property_type, n_rows, seed=6))
+
+        bias, contributions = forest.predict_contributions(X)
+        expected = pipeline[-1].predict(X)
+        if not np.allclose(bias + contributions.sum(axis=1), expected, rtol=1e-9):
+            raise AssertionError(f"rows={n_rows}: contributions do not add up to the prediction")
+
+        predict_time = timeit.timeit(lambda: forest.predict(X), number=args.repeat) / args.repeat
+        explain_time = timeit.timeit(lambda: forest.predict_contributions(X),
+                                     number=args.repeat) / args.repeat
+        print(f"rows={n_rows:>3} | predict {1000 * predict_time:8.3f} ms"
+              f" | contributions {1000 * explain_time:8.3f} ms"
+              f" ({explain_time / predict_time:4.2f}x)"
+              f" | non-zero features per row {np.count_nonzero(contributions, axis=1).mean():.1f}"
+              f" of {X.shape[1]}")
+
+
+if __name__ == "__main__":
+    main()
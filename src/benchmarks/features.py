@@ -0,0 +1,69 @@
+"""
+Checks that the pandas-free FeatureVectorizer.transform_records gives exactly
+the same feature rows as the fitted sklearn preprocessing, and times both.
+
+Usage (from src/):
+    python -m benchmarks.features --n-rows 5000
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from prediction import records_to_dataframe, get_vectorizer
+from benchmarks.synthetic import make_records, fit_pipeline
+
+
+def with_edge_cases(records: list[dict]) -> list[dict]:
+    """
+    Adds missing and unknown values the API accepts to some of the records
+    """
+    for idx, record in enumerate(records):
+        match idx % 6:
+            case 1:
+                record["province"] = None
+            case 2:
+                record["subregion"] = "unknown-subregion"
+            case 3 if "market" in record:
+                record["market"] = None
+            case 4 if "n_rooms" in record:
+                record["n_rooms"] = None
+            case 5 if "location" in record:
+                record["location"] = None if idx % 2 else "unknown-location"
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for property_type in ["apartments", "houses", "lands"]:
+        pipeline = fit_pipeline(property_type, n_samples=2000, n_estimators=10, max_depth=20)
+        vectorizer = get_vectorizer(pipeline)
+        records = with_edge_cases(make_records(property_type, args.n_rows, seed=2))
+
+        expected = pipeline[:-1].transform(records_to_dataframe(records)).astype(np.float64)
+        actual = vectorizer.transform_records(records)
+        if not np.array_equal(expected, actual, equal_nan=True):
+            mismatched_rows = np.flatnonzero(~np.all((expected == actual)
+                                                     | (np.isnan(expected) & np.isnan(actual)), axis=1))
+            raise AssertionError(f"{property_type}: {len(mismatched_rows)} rows differ,"
+                                 f" e.g. {records[mismatched_rows[0]]}")
+
+        single = records[:1]
+        pandas_time = timeit.timeit(
+            lambda: pipeline[:-1].transform(records_to_dataframe(single)),
+            number=args.repeat) / args.repeat
+        vectorizer_time = timeit.timeit(
+            lambda: vectorizer.transform_records(single), number=args.repeat) / args.repeat
+
+        print(f"{property_type:>10}: {args.n_rows} rows identical"
+              f" | single offer: pandas {1e6 * pandas_time:8.1f} us"
+              f", vectorizer {1e6 * vectorizer_time:6.1f} us"
+              f" ({pandas_time / vectorizer_time:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
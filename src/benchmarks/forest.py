@@ -0,0 +1,47 @@
+"""
+Compares Pipeline.predict with the compiled forest inference.
+
+Usage (from src/):
+    python -m benchmarks.forest --property-type apartments --n-estimators 600 --max-depth 110
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from forest import compile_pipeline
+from prediction import records_to_dataframe
+from benchmarks.synthetic import make_records, fit_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--property-type", default="apartments")
+    parser.add_argument("--n-samples", type=int, default=5000)
+    parser.add_argument("--n-estimators", type=int, default=600)
+    parser.add_argument("--max-depth", type=int, default=110)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pipeline = fit_pipeline(args.property_type, args.n_samples,
+                            args.n_estimators, args.max_depth)
+    compiled = compile_pipeline(pipeline)
+    print(f"{args.property_type}: {compiled!r}")
+
+    for n_rows in [1, 32, 1000]:
+        df = records_to_dataframe(make_records(args.property_type, n_rows, seed=1))
+        expected = pipeline.predict(df)
+        max_rel_diff = np.max(np.abs(compiled.predict(df) - expected) / np.abs(expected))
+
+        number = args.repeat if n_rows < 1000 else 3
+        sklearn_time = timeit.timeit(lambda: pipeline.predict(df), number=number) / number
+        compiled_time = timeit.timeit(lambda: compiled.predict(df), number=number) / number
+
+        print(f"rows={n_rows:>5} | Pipeline.predict {1000 * sklearn_time:9.3f} ms"
+              f" | compiled {1000 * compiled_time:9.3f} ms"
+              f" | speedup {sklearn_time / compiled_time:5.2f}x"
+              f" | max rel. diff {max_rel_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
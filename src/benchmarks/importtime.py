@@ -0,0 +1,67 @@
+"""
+Measures how long `import main` takes with `python -X importtime` and
+lists the slowest modules. Heavy dependencies (sklearn, pandas, Google Cloud
+Storage, BeautifulSoup, ...) should only be imported when a model or
+a scraper is loaded, so they are reported if they show up here.
+
+Usage (from src/):
+    python -m benchmarks.importtime --top 20 --max-ms 1500
+"""
+import sys
+import argparse
+import subprocess
+
+
+HEAVY_MODULES = ["sklearn", "pandas", "scipy", "google.cloud.storage", "bs4", "pyarrow"]
+
+
+def measure_imports(module: str) -> list[tuple[str, float, float]]:
+    """
+    Imports a module in a fresh interpreter
+
+    Returns:
+        (list[tuple[str, float, float]]): imported modules with their own and
+                                          cumulative import times in ms
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr}")
+
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        imports.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="exit with an error if the import takes longer")
+    args = parser.parse_args()
+
+    imports = measure_imports(args.module)
+    total_ms = next(cumulative for name, _, cumulative in imports if name == args.module)
+
+    print(f"import {args.module}: {total_ms:.0f} ms, {len(imports)} modules")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_ms, cumulative_ms in sorted(imports, key=lambda item: -item[2])[:args.top]:
+        print(f"{cumulative_ms:14.1f} {self_ms:9.1f}  {name}")
+
+    imported = {name for name, _, _ in imports}
+    heavy = [heavy_module for heavy_module in HEAVY_MODULES if heavy_module in imported]
+    if heavy:
+        print(f"heavy modules imported eagerly: {', '.join(heavy)}")
+
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"import time {total_ms:.0f} ms exceeds {args.max_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
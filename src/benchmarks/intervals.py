@@ -0,0 +1,68 @@
+"""
+Compares prediction intervals computed from per-tree predictions in one
+vectorized pass over the compiled forest with the naive loop over
+`estimators_`, and with a plain point prediction.
+
+Latency budget: for a single offer, intervals should cost at most about
+twice a plain Pipeline.predict call, independently of the quantiles asked.
+
+Usage (from src/):
+    python -m benchmarks.intervals --n-estimators 600 --max-depth 110
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from prediction import records_to_dataframe, get_vectorizer, get_compiled_forest
+from benchmarks.synthetic import make_records, fit_pipeline
+
+
+def naive_quantiles(pipeline, df, quantiles):
+    X = pipeline[:-1].transform(df)
+    per_tree = np.stack([tree.predict(X) for tree in pipeline[-1].estimators_], axis=1)
+    return per_tree.mean(axis=1), np.quantile(per_tree, quantiles, axis=1).T
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--property-type", default="apartments")
+    parser.add_argument("--n-samples", type=int, default=5000)
+    parser.add_argument("--n-estimators", type=int, default=600)
+    parser.add_argument("--max-depth", type=int, default=110)
+    parser.add_argument("--quantiles", type=float, nargs="+", default=[0.05, 0.25, 0.75, 0.95])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pipeline = fit_pipeline(args.property_type, args.n_samples,
+                            args.n_estimators, args.max_depth)
+    vectorizer = get_vectorizer(pipeline)
+    forest = get_compiled_forest(pipeline)
+
+    for n_rows in [1, 32, 1000]:
+        records = make_records(args.property_type, n_rows, seed=5)
+        df = records_to_dataframe(records)
+
+        def vectorized():
+            return forest.predict_quantiles(vectorizer.transform_records(records), args.quantiles)
+
+        expected_means, expected_bands = naive_quantiles(pipeline, df, args.quantiles)
+        means, bands = vectorized()
+        if not (np.allclose(means, expected_means, rtol=1e-9)
+                and np.allclose(bands, expected_bands, rtol=1e-9)):
+            raise AssertionError(f"rows={n_rows}: vectorized intervals differ from the naive ones")
+
+        number = args.repeat if n_rows < 1000 else 3
+        point_time = timeit.timeit(lambda: pipeline.predict(df), number=number) / number
+        naive_time = timeit.timeit(lambda: naive_quantiles(pipeline, df, args.quantiles),
+                                   number=number) / number
+        vectorized_time = timeit.timeit(vectorized, number=number) / number
+
+        print(f"rows={n_rows:>5} | point {1000 * point_time:9.3f} ms"
+              f" | naive intervals {1000 * naive_time:9.3f} ms"
+              f" | vectorized intervals {1000 * vectorized_time:9.3f} ms"
+              f" ({vectorized_time / point_time:4.2f}x point)")
+
+
+if __name__ == "__main__":
+    main()
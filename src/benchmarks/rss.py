@@ -0,0 +1,116 @@
+"""
+Measures memory of API workers started by `uvicorn --workers` (each worker
+loads its own models) and by the preloading server (models loaded once and
+shared copy-on-write). Models are loaded as configured in conf/config.toml.
+
+RSS counts shared pages in every worker, PSS splits them between the
+processes sharing them and USS is the memory private to a worker.
+
+Usage (from src/):
+    python -m benchmarks.rss --workers 4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import httpx
+
+from models import get_example_record
+
+
+COMMANDS = {
+    "uvicorn": lambda port, workers: [sys.executable, "-m", "uvicorn", "main:app",
+                                      "--port", str(port), "--workers", str(workers),
+                                      "--log-level", "warning"],
+    "preload": lambda port, workers: [sys.executable, "server.py", "--port", str(port),
+                                      "--workers", str(workers), "--log-level", "warning"],
+}
+
+
+def descendants(pid: int) -> list[int]:
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+
+    found, queue = [], [pid]
+    while queue:
+        parent = queue.pop()
+        children = [child for child, child_parent in parents.items() if child_parent == parent]
+        found.extend(children)
+        queue.extend(children)
+    return found
+
+
+def memory_of(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": values["Rss"], "pss": values["Pss"],
+            "uss": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def wait_until_ready(port: int, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/status/models", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server on port {port} not ready after {timeout} s")
+
+
+def measure(mode: str, port: int, workers: int, n_requests: int, timeout: float):
+    start = time.time()
+    process = subprocess.Popen(COMMANDS[mode](port, workers))
+    try:
+        wait_until_ready(port, timeout)
+        startup_time = time.time() - start
+
+        # Touches the models in all workers, as real traffic would
+        for property_type in ["apartments", "houses", "lands"]:
+            for _ in range(n_requests):
+                httpx.post(f"http://127.0.0.1:{port}/{property_type}/from-json",
+                           content=json.dumps(get_example_record(property_type), default=str),
+                           timeout=30)
+
+        memory = {pid: memory_of(pid) for pid in [process.pid, *descendants(process.pid)]}
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    print(f"{mode}: {workers} workers ready in {startup_time:.1f} s")
+    for pid, values in memory.items():
+        role = "master" if pid == process.pid else "child"
+        print(f"  {role:>6} {pid:>7}: RSS {values['rss']:8.1f} MiB"
+              f" | PSS {values['pss']:8.1f} MiB | USS {values['uss']:8.1f} MiB")
+    print(f"  total PSS {sum(values['pss'] for values in memory.values()):.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--n-requests", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--modes", nargs="+", default=list(COMMANDS), choices=list(COMMANDS))
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        measure(mode, args.port, args.workers, args.n_requests, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Compares serial searching (one page at a time) with searching in windows
+of concurrent pages. Search pages are served by a local
+server mimicking Otodom search results: full pages up to `--n-full-pages`,
+then one short page and empty pages after it. Both modes are paced by the
+rate controller of the service, serial searching by its rate and windows by
+its search windows budget, as configured in conf/config.toml unless
+`--rate` or `--window-rate` is given.
+
+Then harvests offers from the same search results and reports how many
+pages are left to fetch, to scrape offers in full or backfill harvested ones,
+compared to searching and scraping every offer.
+
+Usage (from src/):
+    python -m benchmarks.search --n-pages 30 --window 6 --latency 0.5
+"""
+import json
+import time
+import argparse
+import threading
+import http.server
+from urllib.parse import urlsplit, parse_qs
+
+from benchmarks.sessions import use_example_headers_if_missing
+from scraping.otodom import OtodomApartmentSearchParams
+from scraping.otodom.otodom_apartment_scraper import OtodomApartmentScraper
+from scraping.rate_control import get_rate_controller, rate_control_config
+from utils.http import TokenBucket
+
+
+def make_search_item(page_number: int, idx: int, missing_ratio: float) -> dict:
+    """
+    Offer item of search results. Location codes are missing in about
+    `missing_ratio` of the items, so they have to be scraped in full. Every
+    fifth item is an offer of a development.
+    """
+    item_id = page_number * 1000 + idx
+    item = {
+        "id": item_id, "slug": f"offer-{page_number}-{idx}-ID{item_id}", "title": "Mieszkanie",
+        "totalPrice": {"value": 500000 + idx, "currency": "PLN"},
+        "areaInSquareMeters": 50.5, "roomsNumber": "TWO", "isPrivateOwner": idx % 2 == 0,
+        "agency": None if idx % 2 == 0 else {"type": "AGENCY"},
+        "dateCreatedFirst": "2024-02-10 12:00:00",
+        "location": {"address": {"city": {"name": "Warszawa"}},
+                     "reverseGeocoding": {"locations": [
+                         {"id": "mazowieckie"}, {"id": "mazowieckie/warszawa"},
+                         {"id": "mazowieckie/warszawa/warszawa/warszawa"}]}},
+    }
+    if idx % 5 == 0:
+        item["developmentId"] = 1000 + page_number
+    if (item_id * 7919) % 1000 < missing_ratio * 1000:
+        del item["location"]["reverseGeocoding"]
+    return item
+
+
+def make_search_handler(page_size: int, n_full_pages: int, latency: float,
+                        missing_ratio: float):
+    class SearchPageHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        n_requests = 0
+
+        def do_GET(self):
+            SearchPageHandler.n_requests += 1
+            time.sleep(latency)
+            page_number = int(parse_qs(urlsplit(self.path).query)["page"][0])
+            if page_number <= n_full_pages:
+                n_items = page_size
+            elif page_number == n_full_pages + 1:
+                n_items = page_size // 3
+            else:
+                n_items = 0
+
+            items = [make_search_item(page_number, idx, missing_ratio) for idx in range(n_items)]
+            if items and page_number > 1:
+                items[0] = make_search_item(page_number - 1, page_size - 1, missing_ratio)  # shifted listing
+            if len(items) > 1:
+                del items[1]["slug"]  # promoted item without an offer url
+            data = {"props": {"pageProps": {"data": {"searchAds": {"items": items}}}}}
+            body = (f"<html><script type='application/json'>{json.dumps(data)}</script>"
+                    f"</html>").encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return SearchPageHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-pages", type=int, default=30)
+    parser.add_argument("--n-full-pages", type=int, default=20)
+    parser.add_argument("--window", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--missing-ratio", type=float, default=0.05,
+                        help="share of search items without location codes")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="initial requests per second, overrides the config")
+    parser.add_argument("--window-rate", type=float, default=None,
+                        help="requests per second of search windows, overrides the config")
+    args = parser.parse_args()
+
+    use_example_headers_if_missing()
+    search_params = OtodomApartmentSearchParams().to_dict()
+    handler = make_search_handler(int(search_params["limit"]), args.n_full_pages, args.latency,
+                                  args.missing_ratio)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    class LocalScraper(OtodomApartmentScraper):
+        BASE_URL = f"http://127.0.0.1:{server.server_port}/"
+
+    scraper = LocalScraper("search-benchmark")
+    controller = get_rate_controller(scraper.SERVICE_NAME)
+
+    def reset_rate_controller():
+        controller.bucket = TokenBucket(args.rate or rate_control_config["initial_rate"],
+                                        rate_control_config["burst"])
+        controller.window_rate = args.window_rate or rate_control_config["window_rate"]
+        controller.window_bucket = TokenBucket(controller.window_rate,
+                                               rate_control_config["window_burst"])
+
+    results = {}
+    for name, window in [("serial", 1), ("windowed", args.window)]:
+        reset_rate_controller()
+        handler.n_requests = 0
+        start = time.perf_counter()
+        results[name] = scraper.list_offers_urls_from_search_params(
+            search_params, args.n_pages, window=window)
+        elapsed = time.perf_counter() - start
+        urls, n_of_urls_from_pages = results[name]
+        print(f"{name:>9}: {elapsed:6.1f} s | {handler.n_requests} pages requested"
+              f" | {len(urls)} unique urls from {len(n_of_urls_from_pages)} pages")
+
+    assert results["serial"][0] == results["windowed"][0], "Urls differ between the modes"
+    print("same urls in the same order")
+
+    reset_rate_controller()
+    handler.n_requests = 0
+    offers, urls_to_scrape, _ = scraper.harvest_offers_from_search_params(
+        search_params, args.n_pages, window=args.window)
+    urls = results["windowed"][0]
+    assert sorted([offer.url for offer in offers] + urls_to_scrape) == sorted(urls), \
+        "Harvested and searched urls differ"
+    assert len(offers) > 0, "No offers harvested"
+    n_to_backfill = sum(1 for offer in offers if scraper.get_missing_fields(offer))
+    print(f"  harvest: {len(offers)} offers from search results ({n_to_backfill} to backfill),"
+          f" {len(urls_to_scrape)} left to scrape"
+          f" | pages to fetch: {handler.n_requests + n_to_backfill + len(urls_to_scrape)}"
+          f" instead of {handler.n_requests + len(urls)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compares the old request path of the batch scrapers (a bare `requests.get`
+with headers re-read from disk for every request) with the pooled
+keep-alive sessions. Reports requests per second, new connections and
+body bytes received over the wire per offer page.
+
+By default pages are served by a local HTTP server mimicking an offer page,
+pass `--url` to benchmark against a real page instead (mind the site's
+rate limits). Without TLS the local server understates the handshake costs
+saved by keep-alive.
+
+Usage (from src/):
+    python -m benchmarks.sessions --n-requests 500 --workers 8
+"""
+import os
+import gzip
+import json
+import time
+import argparse
+import tempfile
+import threading
+import http.server
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import utils.scraping
+from utils.scraping import generate_random_headers, load_headers_config
+from scraping.sessions import SessionPool
+
+
+EXAMPLE_HEADERS = {
+    "User-Agent": ["Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+                   "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"],
+    "Accept": ["text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"],
+    "Accept-Language": ["pl-PL,pl;q=0.9,en-US;q=0.8,en;q=0.7"],
+}
+
+
+def use_example_headers_if_missing():
+    """
+    Points the headers config to example headers if the real one is absent
+    """
+    if not os.path.exists(utils.scraping.PATH_TO_HEADERS_CONFIG):
+        headers_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+        json.dump(EXAMPLE_HEADERS, headers_file)
+        headers_file.close()
+        utils.scraping.PATH_TO_HEADERS_CONFIG = headers_file.name
+
+
+def make_offer_page() -> bytes:
+    ad = {"id": 1, "title": "Mieszkanie 2 pokoje", "characteristics": [
+        {"key": f"feature_{idx}", "value": str(idx), "localizedValue": f"wartość {idx}"}
+        for idx in range(500)]}
+    next_data = json.dumps({"props": {"pageProps": {"ad": ad}}})
+    return (f"<html><head><title>Offer</title></head><body>{'<div class=x></div>' * 2000}"
+            f"<script id='__NEXT_DATA__' type='application/json'>{next_data}</script>"
+            f"</body></html>").encode()
+
+
+class OfferPageHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body are written separately
+    page = make_offer_page()
+    page_gzip = gzip.compress(page)
+    connections = set()
+
+    def do_GET(self):
+        OfferPageHandler.connections.add(self.client_address)
+        use_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = self.page_gzip if use_gzip else self.page
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def get_bare(url: str) -> requests.Response:
+    load_headers_config.cache_clear()  # the old path re-read headers.json each time
+    return requests.get(url, headers=generate_random_headers())
+
+
+def run(name: str, get_fn, url: str, n_requests: int, workers: int):
+    OfferPageHandler.connections.clear()
+
+    def fetch(_):
+        response = get_fn(url)
+        response.raise_for_status()
+        return response.raw.tell()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        wire_bytes = list(executor.map(fetch, range(n_requests)))
+    elapsed = time.perf_counter() - start
+
+    connections = len(OfferPageHandler.connections) or "n/a"
+    print(f"{name:>8}: {n_requests / elapsed:8.1f} req/s | connections: {connections}"
+          f" | {sum(wire_bytes) / n_requests / 1024:7.1f} KiB on the wire per offer")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--n-requests", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    use_example_headers_if_missing()
+
+    url = args.url
+    if url is None:
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), OfferPageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/pl/oferta/offer"
+        print(f"offer page: {len(OfferPageHandler.page) / 1024:.1f} KiB,"
+              f" {len(OfferPageHandler.page_gzip) / 1024:.1f} KiB gzipped")
+
+    pool = SessionPool(n_sessions=args.workers, pool_maxsize=2, timeout=30)
+    run("bare", get_bare, url, args.n_requests, args.workers)
+    run("pooled", pool.get, url, args.n_requests, args.workers)
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
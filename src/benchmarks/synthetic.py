@@ -0,0 +1,70 @@
+import random
+import importlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestRegressor
+
+
+PROVINCES = ["mazowieckie", "malopolskie", "slaskie", "pomorskie", "wielkopolskie",
+             "dolnoslaskie", "lodzkie", "zachodniopomorskie"]
+SUBREGIONS = [f"powiat-{i}" for i in range(60)]
+AREA_COLUMNS = {"apartments": "apartment_area", "houses": "house_area", "lands": "land_area"}
+
+
+def make_records(property_type: str, n: int, seed: int = 0) -> list[dict]:
+    """
+    Generates random offers shaped like the API models of a property type
+    """
+    rnd = random.Random(seed)
+    records = []
+    for _ in range(n):
+        record = {
+            "advert_type": rnd.choice(["PRIVATE", "AGENCY"]),
+            "utc_created_at": datetime(2023, 1, 1) + timedelta(days=rnd.randint(0, 500),
+                                                               hours=rnd.randint(0, 23)),
+            "province": rnd.choice(PROVINCES),
+            "subregion": rnd.choice(SUBREGIONS),
+        }
+        match property_type:
+            case "apartments":
+                record.update(market=rnd.choice(["PRIMARY", "SECONDARY"]),
+                              apartment_area=rnd.randint(20, 150),
+                              n_rooms=rnd.choice([1, 2, 3, 4, 5]),
+                              build_year=rnd.randint(1900, 2024))
+            case "houses":
+                record.update(location=rnd.choice(["country", "suburban", "city"]),
+                              market=rnd.choice(["PRIMARY", "SECONDARY"]),
+                              lot_area=rnd.randint(300, 3000),
+                              house_area=rnd.randint(60, 300),
+                              n_rooms=rnd.choice([3, 4, 5, 6]),
+                              build_year=rnd.randint(1900, 2024))
+            case "lands":
+                record.update(location=rnd.choice(["country", "suburban", "city"]),
+                              land_area=rnd.randint(300, 5000))
+        records.append(record)
+
+    return records
+
+
+def fit_pipeline(property_type: str, n_samples: int = 5000,
+                 n_estimators: int = 600, max_depth: int = 110):
+    """
+    Fits the property type pipeline on random offers, so benchmarks do not
+    need access to the production models
+    """
+    pipeline = clone(importlib.import_module(f"{property_type}.pipeline").pipeline)
+
+    df = pd.DataFrame(make_records(property_type, n_samples))
+    df["utc_created_at"] = pd.to_datetime(df["utc_created_at"])
+    noise = np.random.RandomState(0).normal(0, 0.1, n_samples)
+    y = df[AREA_COLUMNS[property_type]] * 5000 * (1 + noise)
+
+    pipeline.set_params(scaler=StandardScaler(),
+                        regressor=RandomForestRegressor(n_estimators=n_estimators,
+                                                        max_depth=max_depth,
+                                                        n_jobs=-1, random_state=0))
+    return pipeline.fit(df, y)
@@ -0,0 +1,258 @@
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from urllib.parse import urldefrag
+
+import numpy as np
+
+from batching import PredictionBatcher
+from prediction import get_vectorizer
+from registry import ModelRegistry
+from metrics import stage_timer
+
+
+_log = logging.getLogger(__name__)
+
+
+class LRUCache:
+    def __init__(self, max_size: int, ttl: float):
+        """
+        In-process LRU cache with a per-entry time to live
+
+        Args:
+            max_size (int): max. number of entries, the least recently used
+                            entry is evicted first
+            ttl (float): number of seconds an entry stays valid
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class PredictionCache:
+    def __init__(self, namespace: str, max_size: int, ttl: float, redis_client=None):
+        """
+        Two-tier cache of price estimates: an in-process LRU and an optional
+        shared Redis tier. Keys hash the model version and the feature row,
+        so estimates of a replaced model are never served.
+
+        Args:
+            namespace (str): prefix of the Redis keys, e.g. the property type
+            max_size (int): max. number of in-process entries
+            ttl (float): number of seconds an estimate stays valid
+            redis_client: `redis.asyncio.Redis` client of the shared tier
+        """
+        self.namespace = namespace
+        self.local = LRUCache(max_size, ttl)
+        self.redis = redis_client
+
+        self.n_local_hits = 0
+        self.n_redis_hits = 0
+        self.n_misses = 0
+        self.n_redis_errors = 0
+
+    def make_key(self, model_version: str, features: np.ndarray) -> str:
+        digest = hashlib.sha256(model_version.encode())
+        digest.update(np.ascontiguousarray(features, dtype=np.float64).tobytes())
+        return f"rea:prediction:{self.namespace}:{digest.hexdigest()}"
+
+    async def get(self, key: str) -> float | None:
+        value = self.local.get(key)
+        if value is not None:
+            self.n_local_hits += 1
+            return value
+
+        if self.redis is not None:
+            try:
+                value = await self.redis.get(key)
+            except Exception as e:
+                self.n_redis_errors += 1
+                _log.warning(f"Reading prediction cache from Redis failed: {e}")
+                value = None
+
+            if value is not None:
+                self.n_redis_hits += 1
+                value = float(value)
+                self.local.set(key, value)
+                return value
+
+        self.n_misses += 1
+        return None
+
+    async def set(self, key: str, value: float):
+        self.local.set(key, value)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, repr(value), ex=int(self.local.ttl))
+            except Exception as e:
+                self.n_redis_errors += 1
+                _log.warning(f"Writing prediction cache to Redis failed: {e}")
+
+    def clear(self):
+        """
+        Drops in-process entries. Redis entries of the old model version
+        are not reachable anymore and expire on their own.
+        """
+        self.local.clear()
+
+    def stats(self) -> dict:
+        n_lookups = self.n_local_hits + self.n_redis_hits + self.n_misses
+        return {
+            "size": len(self.local),
+            "max_size": self.local.max_size,
+            "ttl": self.local.ttl,
+            "redis": self.redis is not None,
+            "local_hits": self.n_local_hits,
+            "redis_hits": self.n_redis_hits,
+            "misses": self.n_misses,
+            "redis_errors": self.n_redis_errors,
+            "hit_ratio": round((n_lookups - self.n_misses) / n_lookups, 4) if n_lookups else 0.0,
+        }
+
+
+class CachedPredictor:
+    def __init__(self, property_type: str, registry: ModelRegistry,
+                 batcher: PredictionBatcher, cache: PredictionCache | None):
+        """
+        Estimates single-offer prices, looking them up in the prediction cache
+        first and sending misses to the batcher
+        """
+        self.property_type = property_type
+        self.registry = registry
+        self.batcher = batcher
+        self.cache = cache
+
+    async def predict(self, record: dict) -> float:
+        if self.cache is None:
+            with stage_timer("prediction"):
+                return await self.batcher.predict(record)
+
+        with stage_timer("cache_lookup"):
+            model = self.registry.get(self.property_type)
+            features = get_vectorizer(model).transform_records([record])[0]
+            key = self.cache.make_key(self.registry.get_version(self.property_type), features)
+            price = await self.cache.get(key)
+
+        if price is None:
+            with stage_timer("prediction"):
+                price = await self.batcher.predict(record)
+            await self.cache.set(key, price)
+        return price
+
+    def clear_cache(self):
+        if self.cache is not None:
+            self.cache.clear()
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        De-duplicates concurrent calls: callers asking for a key that is
+        already being computed await the in-flight call instead of
+        starting their own
+        """
+        self._in_flight = {}
+        self.n_calls = 0
+        self.n_shared = 0
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    async def run(self, key, fn: Callable[[], Awaitable]):
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.n_shared += 1
+            return await asyncio.shield(future)
+
+        self.n_calls += 1
+        future = asyncio.ensure_future(fn())
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+
+class OfferCache:
+    def __init__(self, max_size: int, ttl: float):
+        """
+        Short-lived cache of scraped offers with single-flight fetching, so
+        popular offer URLs are scraped once per TTL however many requests
+        ask for them at the same time
+
+        Args:
+            max_size (int): max. number of cached offers
+            ttl (float): number of seconds an offer stays valid
+        """
+        self.local = LRUCache(max_size, ttl)
+        self.single_flight = SingleFlight()
+
+        self.n_hits = 0
+        self.n_misses = 0
+
+    @staticmethod
+    def make_key(url: str) -> str:
+        return urldefrag(url.strip()).url
+
+    async def get(self, url: str, scrape_fn: Callable[[str], Awaitable]):
+        """
+        Returns the cached offer of an URL, scraping it with `scrape_fn`
+        if it is not cached yet. Failed scrapes are not cached.
+        """
+        key = self.make_key(url)
+        offer = self.local.get(key)
+        if offer is not None:
+            self.n_hits += 1
+            return offer
+
+        self.n_misses += 1
+
+        async def scrape():
+            scraped_offer = await scrape_fn(url)
+            self.local.set(key, scraped_offer)
+            return scraped_offer
+
+        return await self.single_flight.run(key, scrape)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.local),
+            "max_size": self.local.max_size,
+            "ttl": self.local.ttl,
+            "hits": self.n_hits,
+            "misses": self.n_misses,
+            "scrapes": self.single_flight.n_calls,
+            "shared_scrapes": self.single_flight.n_shared,
+            "in_flight": len(self.single_flight),
+        }
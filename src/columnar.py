@@ -0,0 +1,71 @@
+"""
+Conversion between Arrow IPC streams and the numpy columns consumed by
+`FeatureVectorizer.transform_columns`
+"""
+import typing
+
+import numpy as np
+import pyarrow as pa
+from pydantic import BaseModel
+
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def read_arrow_stream(body: bytes) -> pa.Table:
+    with pa.ipc.open_stream(pa.py_buffer(body)) as reader:
+        return reader.read_all()
+
+
+def write_arrow_stream(table: pa.Table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def table_to_columns(table: pa.Table, model_class: type[BaseModel]) -> dict[str, np.ndarray]:
+    """
+    Checks an Arrow table against the fields of an offer model and converts
+    its columns to numpy. Numeric columns without nulls are not copied.
+
+    Args:
+        table (pa.Table): offers, one column per model field
+        model_class (type[BaseModel]): model describing a single offer
+
+    Returns:
+        (dict[str, np.ndarray]): columns of all model fields, missing
+                                 optional fields are filled with None
+    """
+    columns = {}
+    for name, field in model_class.model_fields.items():
+        if name not in table.column_names:
+            if field.is_required():
+                raise ValueError(f"Required column {name} is missing")
+            columns[name] = np.full(table.num_rows, None, dtype=object)
+            continue
+
+        column = table.column(name)
+        if column.null_count and type(None) not in typing.get_args(field.annotation):
+            raise ValueError(f"Column {name} contains nulls")
+
+        if name == "utc_created_at":
+            if pa.types.is_timestamp(column.type):
+                column = column.cast(pa.timestamp("ns", tz=column.type.tz))
+                columns[name] = column.to_numpy().astype("datetime64[ns]")
+            else:
+                columns[name] = np.array(column.to_pylist(), dtype="datetime64[ns]")
+        elif pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            columns[name] = column.to_numpy(zero_copy_only=False).astype(object)
+        elif pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+            columns[name] = column.to_numpy(zero_copy_only=False)
+        elif pa.types.is_null(column.type):
+            columns[name] = np.full(table.num_rows, None, dtype=object)
+        else:
+            raise ValueError(f"Column {name} has unsupported type {column.type}")
+
+    return columns
+
+
+def prices_to_arrow_stream(prices: np.ndarray) -> bytes:
+    return write_arrow_stream(pa.table({"result": pa.array(prices, type=pa.float64())}))
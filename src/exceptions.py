@@ -11,3 +11,26 @@ class InvalidOffer(Exception):
 class AlreadyStoredOffer(Exception):
     def __init__(self, message):
         super().__init__(message)
+
+
+class InvalidArtifact(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class ServiceOverloaded(Exception):
+    def __init__(self, message, status_code, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ServiceBlocked(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class InvalidUpload(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
@@ -0,0 +1,124 @@
+import asyncio
+import contextvars
+import multiprocessing
+import concurrent.futures
+from collections.abc import Callable
+
+import prediction
+
+
+_worker_models = {}
+_worker_compiled = False
+
+
+def _init_worker(versions: dict[str, str], compiled: bool):
+    """
+    Loads the given model versions once per worker process of the process pool
+    """
+    global _worker_compiled
+    _worker_compiled = compiled
+    for property_type, version in versions.items():
+        _get_worker_model(property_type, version)
+
+
+def _get_worker_model(property_type: str, version: str):
+    """
+    Returns the model of a property type in the version used by the main
+    process, loading it if the worker has no or another version
+    """
+    from utl import load_model_version
+
+    worker_version, model = _worker_models.get(property_type, (None, None))
+    if worker_version != version:
+        model = prediction.prepare_model(
+            load_model_version(property_type, version, _worker_compiled))
+        _worker_models[property_type] = (version, model)
+    return model
+
+
+def _run_in_worker(property_type: str, version: str, method: str, args: tuple):
+    return getattr(prediction, method)(_get_worker_model(property_type, version), *args)
+
+
+class InferenceExecutor:
+    KINDS = ("thread", "process")
+
+    def __init__(self,
+                 kind: str = "thread",
+                 max_workers: int = None,
+                 get_model: Callable[[str], object] = None,
+                 get_version: Callable[[str], str | None] = None,
+                 compiled: bool = False):
+        """
+        Runs CPU-heavy model inference away from the asyncio event loop
+
+        Args:
+            kind (str): "thread" runs inference on the models loaded in this
+                        process, "process" runs it in a pool of processes
+                        which load their own copy of the models, in the same
+                        version as this process
+            max_workers (int): size of the pool
+            get_model (Callable): returns the current model of a property type,
+                                  used in the "thread" mode
+            get_version (Callable): returns the current model version of
+                                    a property type, used in the "process" mode
+            compiled (bool): whether the process workers compile the models
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Executor kind must be one of {self.KINDS}, got {kind}")
+
+        self.kind = kind
+        self.max_workers = max_workers
+        self._get_model = get_model
+        self._get_version = get_version
+        self._compiled = compiled
+        self._pool = None
+
+    def start(self, versions: dict[str, str] = None):
+        """
+        Args:
+            versions (dict[str, str]): model versions the process workers
+                                       load on start, other models are loaded
+                                       on first use
+        """
+        if self.kind == "process":
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(versions or {}, self._compiled))
+        else:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference")
+
+    def restart(self, versions: dict[str, str] = None):
+        """
+        Replaces the pool with a fresh one, e.g. to make process workers load
+        a new model version up front and drop the old one. Tasks already
+        submitted finish in the old pool.
+        """
+        old_pool = self._pool
+        self.start(versions)
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, property_type: str, method: str, *args):
+        """
+        Calls `prediction.<method>(model, *args)` in the pool and awaits
+        the result without blocking the event loop
+        """
+        loop = asyncio.get_running_loop()
+        if self.kind == "process":
+            return await loop.run_in_executor(self._pool, _run_in_worker, property_type,
+                                              self._get_version(property_type), method, args)
+
+        model = self._get_model(property_type)
+        context = contextvars.copy_context()  # keeps the metrics labels of the request
+        return await loop.run_in_executor(self._pool, context.run, getattr(prediction, method),
+                                          model, *args)
@@ -0,0 +1,319 @@
+import math
+import functools
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas, sklearn and the feature engineering functions are imported on first
+# use, so that serving compiled models does not import them at all
+
+
+@functools.cache
+def get_feature_engineering_functions() -> dict:
+    from apartments.preprocessing import apartments_feature_engineering
+    from houses.preprocessing import houses_feature_engineering
+    from lands.preprocessing import lands_feature_engineering
+
+    return {
+        "apartments": apartments_feature_engineering,
+        "houses": houses_feature_engineering,
+        "lands": lands_feature_engineering,
+    }
+
+
+_DUMMY_OFFER = {"advert_type": "PRIVATE", "market": "PRIMARY", "location": "city",
+                "utc_created_at": datetime(2023, 1, 1)}
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _created_at(offer: dict) -> datetime:
+    created_at = offer["utc_created_at"]
+    return datetime.fromisoformat(created_at) if isinstance(created_at, str) else created_at
+
+
+# Record-level equivalents of the columns produced by the feature engineering functions
+ENGINEERED_FEATURES = {
+    "is_advert_private": lambda offer: offer["advert_type"] == "PRIVATE",
+    "is_primary_market": lambda offer: offer["market"] == "PRIMARY",
+    "weekday": lambda offer: _created_at(offer).weekday(),
+    "season": lambda offer: {12: 0, 1: 0, 2: 0, 3: 1, 4: 1, 5: 1, 6: 2, 7: 2, 8: 2,
+                             9: 3, 10: 3, 11: 3}[_created_at(offer).month],
+    "timeline": lambda offer: (_created_at(offer) - datetime(2023, 1, 1)).days,
+    "location": lambda offer: {None: 0, "country": 1, "suburban": 2, "city": 3}.get(
+        None if _is_missing(offer["location"]) else offer["location"], np.nan),
+}
+
+
+def _days_since_epoch(created_at: np.ndarray) -> np.ndarray:
+    nanoseconds = created_at.astype("datetime64[ns]").astype(np.int64)
+    return nanoseconds // (24 * 3600 * 10**9)
+
+
+_SEASONS = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])  # by month - 1
+_TIMELINE_START = (np.datetime64("2023-01-01", "D") - np.datetime64("1970-01-01", "D")).astype(np.int64)
+_LOCATIONS = {None: 0, "country": 1, "suburban": 2, "city": 3}
+
+# Column-wise equivalents of ENGINEERED_FEATURES, taking a dict of numpy columns
+COLUMNAR_ENGINEERED_FEATURES = {
+    "is_advert_private": lambda columns: columns["advert_type"] == "PRIVATE",
+    "is_primary_market": lambda columns: columns["market"] == "PRIMARY",
+    # 1970-01-01 was a Thursday
+    "weekday": lambda columns: (_days_since_epoch(columns["utc_created_at"]) + 3) % 7,
+    "season": lambda columns: _SEASONS[
+        columns["utc_created_at"].astype("datetime64[M]").astype(np.int64) % 12],
+    "timeline": lambda columns: _days_since_epoch(columns["utc_created_at"]) - _TIMELINE_START,
+    "location": lambda columns: np.fromiter(
+        (_LOCATIONS.get(None if _is_missing(value) else value, np.nan)
+         for value in columns["location"]),
+        dtype=np.float64, count=len(columns["location"])),
+}
+
+
+class FeatureVectorizer:
+    def __init__(self, steps: list[dict], scaler: dict | None):
+        """
+        Plain-data equivalent of the fitted preprocessing part of a pipeline
+        (column transformer and scaler), which can be stored without pickle
+
+        Args:
+            steps (list[dict]): column transformer steps in output order, each
+                                with a `kind` ("function", "one_hot" or
+                                "passthrough") and its input `columns`
+            scaler (dict | None): scaler kind and fitted parameters
+        """
+        self.steps = steps
+        self.scaler = scaler
+
+        self._category_indices = [
+            {None if _is_missing(c) else c: i for i, c in enumerate(step["categories"])}
+            if step["kind"] == "one_hot" else None
+            for step in steps
+        ]
+        self._scaler_arrays = {key: np.asarray(value, dtype=np.float64)
+                               for key, value in (scaler or {}).items()
+                               if isinstance(value, list)}
+        self._setters = self._compile_setters()
+        self.n_features = len(self.feature_names)
+
+    @property
+    def feature_names(self) -> list[str]:
+        names = []
+        for step in self.steps:
+            match step["kind"]:
+                case "function":
+                    names.extend(step["output_columns"])
+                case "one_hot":
+                    names.extend(f"{step['columns'][0]}={category}"
+                                 for category in step["categories"])
+                case "passthrough":
+                    names.extend(step["columns"])
+        return names
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Extracts fitted preprocessing parameters from a sklearn pipeline made
+        of a column transformer, an optional scaler and a regressor
+        """
+        import pandas as pd
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+        column_transformer, scaler = pipeline[0], pipeline[1]
+        if not isinstance(column_transformer, ColumnTransformer):
+            raise ValueError("Pipeline must start with a ColumnTransformer")
+
+        steps = []
+        for name, transformer, columns in column_transformer.transformers_:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            columns = [column_transformer.feature_names_in_[c] if isinstance(c, (int, np.integer)) else c
+                       for c in columns]
+
+            if transformer == "passthrough" or (isinstance(transformer, FunctionTransformer)
+                                                and transformer.func is None):
+                steps.append({"kind": "passthrough", "columns": list(columns)})
+            elif isinstance(transformer, FunctionTransformer):
+                property_type = next((key for key, func in get_feature_engineering_functions().items()
+                                      if func is transformer.func), None)
+                if property_type is None:
+                    raise ValueError(f"Unknown feature engineering function in step {name}")
+                dummy = pd.DataFrame({column: [_DUMMY_OFFER[column]] for column in columns})
+                steps.append({"kind": "function",
+                              "property_type": property_type,
+                              "columns": list(columns),
+                              "output_columns": list(transformer.func(dummy).columns)})
+            elif isinstance(transformer, OneHotEncoder):
+                if len(columns) != 1 or transformer.handle_unknown != "ignore":
+                    raise ValueError(f"Unsupported one-hot encoder in step {name}")
+                steps.append({"kind": "one_hot",
+                              "columns": list(columns),
+                              "categories": [None if _is_missing(c) else c
+                                             for c in transformer.categories_[0].tolist()]})
+            else:
+                raise ValueError(f"Unsupported transformer in step {name}: {transformer}")
+
+        return cls(steps, cls._scaler_to_dict(scaler))
+
+    @staticmethod
+    def _scaler_to_dict(scaler) -> dict | None:
+        from sklearn.preprocessing import StandardScaler, MinMaxScaler
+
+        if scaler is None or scaler == "passthrough":
+            return None
+        if isinstance(scaler, StandardScaler):
+            return {"kind": "standard",
+                    "mean": None if scaler.mean_ is None else scaler.mean_.tolist(),
+                    "scale": None if scaler.scale_ is None else scaler.scale_.tolist()}
+        if isinstance(scaler, MinMaxScaler):
+            return {"kind": "minmax",
+                    "min": scaler.min_.tolist(),
+                    "scale": scaler.scale_.tolist(),
+                    "clip": scaler.clip,
+                    "feature_range": list(scaler.feature_range)}
+        raise ValueError(f"Unsupported scaler: {scaler}")
+
+    def _compile_setters(self) -> list:
+        """
+        Prepares one function per input field, writing its features
+        straight into a preallocated output row
+        """
+        def engineered_setter(offset, name):
+            if name not in ENGINEERED_FEATURES:
+                raise ValueError(f"No record-level equivalent of engineered feature {name}")
+            func = ENGINEERED_FEATURES[name]
+
+            def set_value(offer, row):
+                row[offset] = func(offer)
+            return set_value
+
+        def one_hot_setter(offset, column, category_indices):
+            def set_value(offer, row):
+                value = offer.get(column)
+                idx = category_indices.get(None if _is_missing(value) else value, -1)
+                if idx >= 0:
+                    row[offset + idx] = 1.0
+            return set_value
+
+        def passthrough_setter(offset, column):
+            def set_value(offer, row):
+                value = offer.get(column)
+                row[offset] = np.nan if value is None else value
+            return set_value
+
+        setters = []
+        offset = 0
+        for step_idx, step in enumerate(self.steps):
+            match step["kind"]:
+                case "function":
+                    for name in step["output_columns"]:
+                        setters.append(engineered_setter(offset, name))
+                        offset += 1
+                case "one_hot":
+                    setters.append(one_hot_setter(offset, step["columns"][0],
+                                                  self._category_indices[step_idx]))
+                    offset += len(step["categories"])
+                case "passthrough":
+                    for column in step["columns"]:
+                        setters.append(passthrough_setter(offset, column))
+                        offset += 1
+        return setters
+
+    def to_dict(self) -> dict:
+        return {"steps": self.steps, "scaler": self.scaler}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["steps"], data["scaler"])
+
+    def _one_hot(self, values, step_idx: int) -> np.ndarray:
+        category_indices = self._category_indices[step_idx]
+        codes = np.fromiter((category_indices.get(None if _is_missing(v) else v, -1)
+                             for v in values), dtype=np.intp, count=len(values))
+        encoded = np.zeros((len(values), len(category_indices)), dtype=np.float64)
+        known = codes >= 0
+        encoded[np.flatnonzero(known), codes[known]] = 1.0
+        return encoded
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        match (self.scaler or {}).get("kind"):
+            case "standard":
+                if "mean" in self._scaler_arrays:
+                    X -= self._scaler_arrays["mean"]
+                if "scale" in self._scaler_arrays:
+                    X /= self._scaler_arrays["scale"]
+            case "minmax":
+                X *= self._scaler_arrays["scale"]
+                X += self._scaler_arrays["min"]
+                if self.scaler["clip"]:
+                    np.clip(X, *self.scaler["feature_range"], out=X)
+        return X
+
+    def transform(self, df: "pd.DataFrame") -> np.ndarray:
+        """
+        Transforms an input frame into the final (scaled) feature matrix
+        """
+        parts = []
+        for step_idx, step in enumerate(self.steps):
+            match step["kind"]:
+                case "function":
+                    func = get_feature_engineering_functions()[step["property_type"]]
+                    parts.append(func(df[step["columns"]]).to_numpy(dtype=np.float64))
+                case "one_hot":
+                    parts.append(self._one_hot(df[step["columns"][0]].to_numpy(dtype=object),
+                                               step_idx))
+                case "passthrough":
+                    parts.append(df[step["columns"]].to_numpy(dtype=np.float64))
+
+        return self._scale(np.hstack(parts))
+
+    def transform_columns(self, columns: dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Pandas-free equivalent of `transform` for column-oriented input, e.g.
+        an Arrow table. `utc_created_at` must be a datetime64 column and
+        numeric columns are used without copying where possible.
+        """
+        n_rows = len(next(iter(columns.values())))
+        X = np.empty((n_rows, self.n_features), dtype=np.float64)
+        offset = 0
+        for step_idx, step in enumerate(self.steps):
+            match step["kind"]:
+                case "function":
+                    for name in step["output_columns"]:
+                        if name not in COLUMNAR_ENGINEERED_FEATURES:
+                            raise ValueError(f"No column-wise equivalent of engineered feature {name}")
+                        X[:, offset] = COLUMNAR_ENGINEERED_FEATURES[name](columns)
+                        offset += 1
+                case "one_hot":
+                    encoded = self._one_hot(columns[step["columns"][0]], step_idx)
+                    X[:, offset:offset + encoded.shape[1]] = encoded
+                    offset += encoded.shape[1]
+                case "passthrough":
+                    for column in step["columns"]:
+                        values = columns[column]
+                        if values.dtype == object:
+                            values = np.array([np.nan if v is None else v for v in values],
+                                              dtype=np.float64)
+                        X[:, offset] = values
+                        offset += 1
+
+        return self._scale(X)
+
+    def transform_records(self, records: list[dict]) -> np.ndarray:
+        """
+        Pandas-free equivalent of `transform` for validated offer records
+        (e.g. `ApartmentModel.model_dump()`), used on the single-offer path
+        """
+        X = np.zeros((len(records), self.n_features), dtype=np.float64)
+        for offer, row in zip(records, X):
+            for set_value in self._setters:
+                set_value(offer, row)
+
+        return self._scale(X)
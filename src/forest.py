@@ -0,0 +1,217 @@
+import numpy as np
+
+from features import FeatureVectorizer
+
+
+class CompiledForest:
+    def __init__(self,
+                 feature: np.ndarray,
+                 threshold: np.ndarray,
+                 children_left: np.ndarray,
+                 children_right: np.ndarray,
+                 value: np.ndarray,
+                 missing_go_to_left: np.ndarray,
+                 roots: np.ndarray,
+                 is_leaf: np.ndarray = None):
+        """
+        Regression forest flattened into contiguous node arrays. Nodes of all
+        trees are stored one after another and children indices are global,
+        so all trees and rows can be walked together with vectorized lookups.
+
+        Args:
+            feature (np.ndarray): feature index tested in each node
+            threshold (np.ndarray): split threshold of each node
+            children_left (np.ndarray): left child of each node, -1 for leaves
+            children_right (np.ndarray): right child of each node, -1 for leaves
+            value (np.ndarray): mean target value of each node
+            missing_go_to_left (np.ndarray): whether NaNs go to the left child
+            roots (np.ndarray): index of the root node of each tree
+            is_leaf (np.ndarray): whether each node is a leaf, derived from
+                                  `children_left` if not given
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.missing_go_to_left = missing_go_to_left
+        self.roots = roots
+        self.is_leaf = children_left == -1 if is_leaf is None else is_leaf
+
+    def __repr__(self):
+        return f"CompiledForest(n_trees={self.n_trees}, n_nodes={self.n_nodes})"
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_estimator(cls, forest):
+        """
+        Flattens trees of a fitted sklearn forest regressor
+        """
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Only single output forests can be compiled")
+
+        node_counts = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+
+        def stack(get_array):
+            return np.concatenate([get_array(tree) for tree in trees])
+
+        def shift_children(children, offset):
+            return np.where(children == -1, -1, children + offset)
+
+        return cls(
+            feature=stack(lambda tree: np.maximum(tree.feature, 0)).astype(np.intp),
+            threshold=stack(lambda tree: tree.threshold).astype(np.float64),
+            children_left=np.concatenate(
+                [shift_children(tree.children_left, offset)
+                 for tree, offset in zip(trees, offsets)]).astype(np.intp),
+            children_right=np.concatenate(
+                [shift_children(tree.children_right, offset)
+                 for tree, offset in zip(trees, offsets)]).astype(np.intp),
+            value=stack(lambda tree: tree.value[:, 0, 0]).astype(np.float64),
+            missing_go_to_left=stack(
+                lambda tree: getattr(tree, "missing_go_to_left",
+                                     np.zeros(tree.node_count))).astype(bool),
+            roots=offsets.astype(np.intp)
+        )
+
+    def _chunk_size(self):
+        return max(1, 2 ** 20 // self.n_trees)
+
+    def apply(self, X) -> np.ndarray:
+        """
+        Returns global indices of the leaves reached by each row in each tree,
+        as an array of shape (n_rows, n_trees)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        chunk_size = self._chunk_size()
+        return np.concatenate([self._apply_chunk(X[start:start + chunk_size])
+                               for start in range(0, len(X), chunk_size)]
+                              or [np.empty((0, self.n_trees), dtype=np.intp)])
+
+    def _apply_chunk(self, X: np.ndarray) -> np.ndarray:
+        n_rows = len(X)
+        nodes = np.tile(self.roots, n_rows)
+        rows = np.repeat(np.arange(n_rows), self.n_trees)
+
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            x = X[rows[active], self.feature[current]]
+            go_left = (x <= self.threshold[current]) | (
+                    np.isnan(x) & self.missing_go_to_left[current])
+            next_nodes = np.where(go_left, self.children_left[current],
+                                  self.children_right[current])
+            nodes[active] = next_nodes
+            active = active[~self.is_leaf[next_nodes]]
+
+        return nodes.reshape(n_rows, self.n_trees)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Averages leaf values of all trees, as RandomForestRegressor does
+        """
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict_quantiles(self, X, quantiles: list[float]) -> (np.ndarray, np.ndarray):
+        """
+        Computes the mean prediction and quantiles of the per-tree predictions
+        in one pass over the forest, chunk by chunk to bound memory use
+
+        Args:
+            X: feature matrix
+            quantiles (list[float]): quantiles to compute, between 0 and 1
+
+        Returns:
+            (np.ndarray): mean predictions of shape (n_rows,)
+            (np.ndarray): quantiles of shape (n_rows, n_quantiles)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        chunk_size = self._chunk_size()
+        means = [np.empty(0)]
+        bands = [np.empty((0, len(quantiles)))]
+        for start in range(0, len(X), chunk_size):
+            per_tree = self.value[self._apply_chunk(X[start:start + chunk_size])]
+            means.append(per_tree.mean(axis=1))
+            bands.append(np.quantile(per_tree, quantiles, axis=1).T)
+
+        return np.concatenate(means), np.concatenate(bands)
+
+    def predict_contributions(self, X) -> (np.ndarray, np.ndarray):
+        """
+        Splits predictions into a bias and per-feature contributions by
+        following decision paths: each split adds the change of the node
+        mean value to the contribution of its feature (Saabas method).
+        The bias plus all contributions of a row equals its prediction.
+
+        Returns:
+            (np.ndarray): bias (mean root value) of shape (n_rows,)
+            (np.ndarray): contributions of shape (n_rows, n_features)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        chunk_size = self._chunk_size()
+        contributions = [np.empty((0, n_features))]
+        for start in range(0, n_rows, chunk_size):
+            contributions.append(self._contributions_chunk(X[start:start + chunk_size]))
+
+        bias = np.full(n_rows, self.value[self.roots].mean())
+        return bias, np.concatenate(contributions) / self.n_trees
+
+    def _contributions_chunk(self, X: np.ndarray) -> np.ndarray:
+        n_rows, n_features = X.shape
+        nodes = np.tile(self.roots, n_rows)
+        rows = np.repeat(np.arange(n_rows), self.n_trees)
+        contributions = np.zeros(n_rows * n_features, dtype=np.float64)
+
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            x = X[rows[active], self.feature[current]]
+            go_left = (x <= self.threshold[current]) | (
+                    np.isnan(x) & self.missing_go_to_left[current])
+            next_nodes = np.where(go_left, self.children_left[current],
+                                  self.children_right[current])
+            contributions += np.bincount(rows[active] * n_features + self.feature[current],
+                                         weights=self.value[next_nodes] - self.value[current],
+                                         minlength=n_rows * n_features)
+            nodes[active] = next_nodes
+            active = active[~self.is_leaf[next_nodes]]
+
+        return contributions.reshape(n_rows, n_features)
+
+
+class CompiledPipeline:
+    def __init__(self, preprocessor: FeatureVectorizer, forest: CompiledForest):
+        """
+        Pipeline equivalent running the forest on compiled node arrays
+
+        Args:
+            preprocessor (FeatureVectorizer): fitted preprocessing steps
+            forest (CompiledForest): compiled regressor
+        """
+        self.preprocessor = preprocessor
+        self.forest = forest
+
+    def __repr__(self):
+        return f"CompiledPipeline({self.forest!r})"
+
+    def predict(self, X) -> np.ndarray:
+        return self.forest.predict(self.preprocessor.transform(X))
+
+
+def compile_pipeline(pipeline) -> CompiledPipeline:
+    """
+    Converts a fitted sklearn pipeline ending with a forest regressor
+    to a CompiledPipeline
+    """
+    return CompiledPipeline(preprocessor=FeatureVectorizer.from_pipeline(pipeline),
+                            forest=CompiledForest.from_estimator(pipeline[-1]))
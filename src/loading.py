@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from collections.abc import Callable
+
+from registry import ModelRegistry
+
+
+_log = logging.getLogger(__name__)
+
+
+class PropertyTypeLoader:
+    def __init__(self,
+                 property_types: list[str],
+                 registry: ModelRegistry,
+                 load_model_fn: Callable[[str], tuple[object, str]],
+                 load_scraper_fn: Callable[[str], object]):
+        """
+        Loads the model and the scraper of each property type, either all at
+        startup, on first use or in a background warmup task. Concurrent
+        requests for a type which is still loading wait for the same load.
+
+        Args:
+            property_types (list[str]): property types to load
+            registry (ModelRegistry): registry the models are swapped into
+            load_model_fn (Callable): loads a property type model, returns
+                                      the model and its version
+            load_scraper_fn (Callable): loads a property type scraper
+        """
+        self.property_types = property_types
+        self.registry = registry
+        self.load_model_fn = load_model_fn
+        self.load_scraper_fn = load_scraper_fn
+
+        self.scrapers = {}
+        self._states = {(property_type, part): "not_loaded"
+                        for property_type in property_types for part in ["model", "scraper"]}
+        self._errors = {}
+        self._locks = {key: asyncio.Lock() for key in self._states}
+        self._warmup_task = None
+
+    def load_model(self, property_type: str) -> tuple[object, str]:
+        """
+        Loads a model without registering it, can be called from any thread
+        """
+        return self._load(property_type, "model", self.load_model_fn)
+
+    def load_scraper(self, property_type: str):
+        return self._load(property_type, "scraper", self.load_scraper_fn)
+
+    def _load(self, property_type: str, part: str, load_fn: Callable):
+        key = (property_type, part)
+        self._states[key] = "loading"
+        try:
+            return load_fn(property_type)
+        except Exception as e:
+            self._states[key] = "failed"
+            self._errors[key] = str(e)
+            raise Exception(f"Loading {property_type} {part} failed: {e}")
+
+    def set_model(self, property_type: str, model, version: str):
+        self.registry.swap(property_type, model, version)
+        self._set_ready(property_type, "model")
+
+    def set_scraper(self, property_type: str, scraper):
+        self.scrapers[property_type] = scraper
+        self._set_ready(property_type, "scraper")
+
+    def _set_ready(self, property_type: str, part: str):
+        self._states[(property_type, part)] = "ready"
+        self._errors.pop((property_type, part), None)
+        _log.info(f"Loaded {property_type} {part}")
+
+    async def ensure_model(self, property_type: str):
+        if property_type in self.registry:
+            return
+        async with self._locks[(property_type, "model")]:
+            if property_type not in self.registry:
+                self.set_model(property_type,
+                               *await asyncio.to_thread(self.load_model, property_type))
+
+    async def ensure_scraper(self, property_type: str):
+        if property_type not in self.scrapers:
+            async with self._locks[(property_type, "scraper")]:
+                if property_type not in self.scrapers:
+                    self.set_scraper(property_type,
+                                     await asyncio.to_thread(self.load_scraper, property_type))
+        return self.scrapers[property_type]
+
+    def start_warmup(self):
+        self._warmup_task = asyncio.get_running_loop().create_task(self._warm_up())
+
+    async def _warm_up(self):
+        for property_type in self.property_types:
+            for ensure in [self.ensure_model, self.ensure_scraper]:
+                try:
+                    await ensure(property_type)
+                except Exception as e:
+                    _log.exception(e)
+
+    async def stop(self):
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            try:
+                await self._warmup_task
+            except asyncio.CancelledError:
+                pass
+            self._warmup_task = None
+
+    def is_ready(self) -> bool:
+        return all(state == "ready" for state in self._states.values())
+
+    def status(self) -> dict:
+        return {
+            property_type: {
+                part: {"state": self._states[(property_type, part)],
+                       "error": self._errors.get((property_type, part))}
+                for part in ["model", "scraper"]
+            }
+            for property_type in self.property_types
+        }
@@ -1,9 +1,22 @@
 import os
+import time
+import toml
 import concurrent.futures
-from fastapi import FastAPI
-
-from routers import houses, apartments, lands
-from utl import load_model, load_scraper
+from fastapi import FastAPI, Request
+
+from routers import houses, apartments, lands, status
+from utl import load_versioned_model, load_scraper, get_model_version
+from models import get_example_record
+from batching import PredictionBatcher
+from executor import InferenceExecutor
+from prediction import predict_records, prepare_model
+from registry import ModelRegistry, ModelReloader
+from caching import PredictionCache, CachedPredictor, OfferCache
+from admission import AdmissionController
+from loading import PropertyTypeLoader
+from metrics import (RequestProfiler, REQUESTS, REQUEST_DURATION, get_request_labels,
+                     request_labels)
+from utils.http import close_async_client, HostLimiter, http_config
 
 
 app = FastAPI(
@@ -14,47 +27,207 @@ app = FastAPI(
 
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "secrets/cloud-storage-sa-key.json"
 
-apartments_model = None
-houses_model = None
-lands_model = None
+model_registry = ModelRegistry()
+
+toml_config = toml.load("../src/conf/config.toml")
+models_config = toml_config["models"]
+inference_config = toml_config["inference"]
+batching_config = toml_config["batching"]
+cache_config = toml_config["prediction_cache"]
+redis_config = toml_config["redis"]
+offer_cache_config = toml_config["offer_cache"]
+bulk_config = toml_config["bulk"]
+admission_config = toml_config["admission"]
+profiling_config = toml_config["profiling"]
+startup_config = toml_config["startup"]
+
+inference_executor = InferenceExecutor(
+    kind=inference_config["executor"],
+    max_workers=inference_config["max_workers"],
+    get_model=model_registry.get,
+    get_version=model_registry.get_version,
+    compiled=inference_config["mode"] == "compiled")
+
+
+def load_current_model(property_type):
+    model, version = load_versioned_model(property_type, inference_config["mode"] == "compiled")
+    return prepare_model(model), version
+
+
+def warm_up_model(property_type, model):
+    predict_records(model, [get_example_record(property_type)])
+
+
+property_type_loader = PropertyTypeLoader(
+    ["apartments", "houses", "lands"],
+    model_registry,
+    load_model_fn=load_current_model,
+    load_scraper_fn=load_scraper)
+
+model_reloader = ModelReloader(
+    model_registry,
+    load_fn=load_current_model,
+    get_version_fn=get_model_version,
+    warmup_fn=warm_up_model,
+    property_types=["apartments", "houses", "lands"],
+    interval=models_config["reload_interval"])
+
+
+def create_batcher(property_type):
+    async def predict_fn(records):
+        with request_labels(property_type, "batch"):
+            return await inference_executor.run(property_type, "predict_records", records)
+
+    return PredictionBatcher(
+        predict_fn,
+        max_batch_size=batching_config["max_batch_size"] if batching_config["enabled"] else 1,
+        max_wait_ms=batching_config["max_wait_ms"],
+        flush_when_idle=batching_config["flush_when_idle"])
+
+
+apartments_batcher = create_batcher("apartments")
+houses_batcher = create_batcher("houses")
+lands_batcher = create_batcher("lands")
+
+
+def create_redis_client():
+    import redis.asyncio as redis
+    return redis.Redis(host=redis_config["host"], port=redis_config["port"],
+                       db=redis_config[cache_config["redis_db"]])
+
+
+def create_predictor(property_type, batcher, redis_client=None):
+    cache = (PredictionCache(property_type, cache_config["max_size"], cache_config["ttl"], redis_client)
+             if cache_config["enabled"] else None)
+    return CachedPredictor(property_type, model_registry, batcher, cache)
+
+
+prediction_redis_client = create_redis_client() if cache_config["redis"] else None
+apartments_predictor = create_predictor("apartments", apartments_batcher, prediction_redis_client)
+houses_predictor = create_predictor("houses", houses_batcher, prediction_redis_client)
+lands_predictor = create_predictor("lands", lands_batcher, prediction_redis_client)
+predictors = {"apartments": apartments_predictor, "houses": houses_predictor, "lands": lands_predictor}
+
+model_registry.add_listener(
+    lambda property_type, old, new: predictors[property_type].clear_cache())
 
-apartments_scraper = None
-houses_scraper = None
-lands_scraper = None
+
+def create_offer_cache():
+    if not offer_cache_config["enabled"]:
+        return None
+    return OfferCache(offer_cache_config["max_size"], offer_cache_config["ttl"])
+
+
+apartments_offer_cache = create_offer_cache()
+houses_offer_cache = create_offer_cache()
+lands_offer_cache = create_offer_cache()
+
+offer_host_limiter = HostLimiter(http_config["max_per_host"])
+
+otodom_offer_admission = AdmissionController("otodom_offer", **admission_config["otodom_offer"])
+otodom_offers_admission = AdmissionController("otodom_offers", **admission_config["otodom_offers"])
+
+request_profiler = RequestProfiler(**profiling_config)
+
+
+@app.middleware("http")
+async def measure_request(request: Request, call_next):
+    known_paths = app.openapi()["paths"].keys()
+    property_type, endpoint = get_request_labels(request.url.path, ["apartments", "houses", "lands"],
+                                                 known_paths)
+    with request_labels(property_type, endpoint):
+        start = time.perf_counter()
+        if request_profiler.should_profile(endpoint):
+            async with request_profiler.profile(property_type, endpoint):
+                response = await call_next(request)
+        else:
+            response = await call_next(request)
+
+        REQUEST_DURATION.observe(time.perf_counter() - start, property_type, endpoint)
+        REQUESTS.inc(property_type, endpoint, str(response.status_code))
+    return response
+
+
+def preload_models():
+    """
+    Loads models of all property types into the registry. Runs in the
+    startup hook, or once in the master process of the preloading server.
+    """
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = {property_type: executor.submit(property_type_loader.load_model, property_type)
+                   for property_type in ["apartments", "houses", "lands"]
+                   if property_type not in model_registry}
+        for property_type, future in futures.items():
+            property_type_loader.set_model(property_type, *future.result())
+
+
+def preload_scrapers():
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = {property_type: executor.submit(property_type_loader.load_scraper, property_type)
+                   for property_type in ["apartments", "houses", "lands"]
+                   if property_type not in property_type_loader.scrapers}
+        for property_type, future in futures.items():
+            property_type_loader.set_scraper(property_type, future.result())
 
 
 @app.on_event("startup")
 async def load_all_models():
-    global apartments_model, houses_model, lands_model
-    try:
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = []
-            for property_type in ["apartments", "houses", "lands"]:
-                futures.append(executor.submit(load_model, property_type))
+    """
+    Loads all models and scrapers before serving, unless lazy loading is
+    enabled. Lazily loaded property types are loaded on first use and,
+    with warmup, one by one in a background task.
+    """
+    if not startup_config["lazy"]:
+        preload_models()
+        preload_scrapers()
+    elif startup_config["warmup"]:
+        property_type_loader.start_warmup()
+
 
-            concurrent.futures.wait(futures)
-            apartments_model, houses_model, lands_model = [f.result() for f in futures]
+@app.on_event("shutdown")
+async def stop_warmup():
+    await property_type_loader.stop()
 
-    except Exception as e:
-        raise Exception(f"Loading models failed: {e}")
+
+def restart_on_new_version(property_type, old, new):
+    """
+    Restarts process workers when a loaded model changes its version, so they
+    load the new one up front. Models loaded for the first time are loaded by
+    the workers on first use.
+    """
+    if old is not None and old.version != new.version:
+        inference_executor.restart(model_registry.get_versions())
 
 
 @app.on_event("startup")
-async def load_all_scrapers():
-    global apartments_scraper, houses_scraper, lands_scraper
-    try:
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = []
-            for property_type in ["apartments", "houses", "lands"]:
-                futures.append(executor.submit(load_scraper, property_type))
+async def start_inference_executor():
+    inference_executor.start(model_registry.get_versions())
+    if inference_executor.kind == "process":
+        model_registry.add_listener(restart_on_new_version)
+
+
+@app.on_event("shutdown")
+async def shutdown_inference_executor():
+    inference_executor.shutdown()
+
+
+@app.on_event("startup")
+async def start_model_reloader():
+    if models_config["reload_interval"] > 0:
+        model_reloader.start()
+
+
+@app.on_event("shutdown")
+async def stop_model_reloader():
+    await model_reloader.stop()
 
-            concurrent.futures.wait(futures)
-            apartments_scraper, houses_scraper, lands_scraper = [f.result() for f in futures]
 
-    except Exception as e:
-        raise Exception(f"Loading models failed: {e}")
+@app.on_event("shutdown")
+async def close_http_client():
+    await close_async_client()
 
 
 app.include_router(houses.router)
 app.include_router(apartments.router)
 app.include_router(lands.router)
+app.include_router(status.router)
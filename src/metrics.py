@@ -0,0 +1,178 @@
+"""
+In-process latency metrics of the API rendered in the Prometheus text
+format. Stage timers take the property type and endpoint from the request
+being handled, so code deep in the call stack does not need them passed.
+
+With the process inference executor, stages run in worker processes
+(validate, features, model) are not recorded.
+"""
+import os
+import time
+import random
+import cProfile
+import threading
+import contextlib
+import contextvars
+from datetime import datetime
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_request_labels = contextvars.ContextVar("request_labels", default=("", ""))
+
+
+def _format_labels(labels: dict) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+class Counter:
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = _format_labels(dict(zip(self.label_names, label_values)))
+                lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...],
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for idx, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    series[0][idx] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self._series.items()):
+                labels = dict(zip(self.label_names, label_values))
+                cumulative = 0
+                for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    bucket_labels = _format_labels({**labels, "le": upper_bound})
+                    lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+                lines.append(f"{self.name}_bucket{{{_format_labels({**labels, 'le': '+Inf'})}}} {count}")
+                lines.append(f"{self.name}_sum{{{_format_labels(labels)}}} {total}")
+                lines.append(f"{self.name}_count{{{_format_labels(labels)}}} {count}")
+        return lines
+
+
+REQUESTS = Counter("rea_requests_total", "Number of handled requests",
+                   ("property_type", "endpoint", "status"))
+REQUEST_DURATION = Histogram("rea_request_duration_seconds", "Request handling time",
+                             ("property_type", "endpoint"))
+STAGE_DURATION = Histogram("rea_stage_duration_seconds", "Time spent in request processing stages",
+                           ("property_type", "endpoint", "stage"))
+METRICS = [REQUESTS, REQUEST_DURATION, STAGE_DURATION]
+
+
+def get_request_labels(path: str, property_types: list[str], known_paths) -> (str, str):
+    """
+    Returns the property type and endpoint labels of a request path, e.g.
+    ("apartments", "from-json") for /apartments/from-json. Unknown paths
+    are labelled "other" to keep the number of series bounded.
+    """
+    property_type, _, endpoint = path.strip("/").partition("/")
+    if property_type in property_types and path in known_paths:
+        return property_type, endpoint
+    return "", path.strip("/") if path in known_paths else "other"
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+@contextlib.contextmanager
+def request_labels(property_type: str, endpoint: str):
+    """
+    Sets the labels of stages timed in the current context
+    """
+    token = _request_labels.set((property_type, endpoint))
+    try:
+        yield
+    finally:
+        _request_labels.reset(token)
+
+
+@contextlib.contextmanager
+def stage_timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, *_request_labels.get(), stage)
+
+
+class RequestProfiler:
+    def __init__(self, enabled: bool, sample_rate: float, min_duration_ms: float,
+                 output_dir: str, endpoints: list[str]):
+        """
+        Profiles a random sample of requests with cProfile and dumps the
+        profiles of the slow ones. cProfile sees the whole event loop thread,
+        so a dump also contains work of requests handled at the same time.
+
+        Args:
+            enabled (bool): whether to profile at all
+            sample_rate (float): fraction of requests to profile
+            min_duration_ms (float): min. duration of a dumped request
+            output_dir (str): directory of the .prof files
+            endpoints (list[str]): endpoints to profile, e.g. "from-otodom-offer",
+                                   all if empty
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.min_duration_ms = min_duration_ms
+        self.output_dir = output_dir
+        self.endpoints = endpoints
+        self._active = False
+
+    def should_profile(self, endpoint: str) -> bool:
+        return (self.enabled and not self._active
+                and (not self.endpoints or endpoint in self.endpoints)
+                and random.random() < self.sample_rate)
+
+    @contextlib.asynccontextmanager
+    async def profile(self, property_type: str, endpoint: str):
+        self._active = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._active = False
+            duration_ms = 1000 * (time.perf_counter() - start)
+            if duration_ms >= self.min_duration_ms:
+                os.makedirs(self.output_dir, exist_ok=True)
+                file_name = (f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+                             f"_{property_type or 'none'}_{endpoint}_{duration_ms:.0f}ms.prof")
+                profiler.dump_stats(os.path.join(self.output_dir, file_name))
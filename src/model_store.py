@@ -0,0 +1,241 @@
+import os
+import json
+import base64
+import shutil
+import hashlib
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from typing import NamedTuple, BinaryIO
+
+
+_log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobInfo(NamedTuple):
+    name: str
+    generation: str
+    md5: str  # base64 encoded digest, as reported by GCS
+
+
+def _md5_of_file(path: str) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            md5.update(chunk)
+    return base64.b64encode(md5.digest()).decode()
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def get_blob_info(self, name: str) -> BlobInfo:
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_blobs(self, prefix: str = "") -> list[BlobInfo]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def download(self, name: str, file_obj: BinaryIO):
+        raise NotImplementedError
+
+
+class GCSBackend(StorageBackend):
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    def __repr__(self):
+        return f"GCSBackend(gs://{self.bucket_name})"
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            from google.cloud import storage
+            self._bucket = storage.Client().bucket(self.bucket_name)
+        return self._bucket
+
+    def get_blob_info(self, name: str) -> BlobInfo:
+        blob = self.bucket.get_blob(name)
+        if blob is None:
+            raise FileNotFoundError(f"Blob {name} not found in gs://{self.bucket_name}")
+        return BlobInfo(blob.name, str(blob.generation), blob.md5_hash)
+
+    def list_blobs(self, prefix: str = "") -> list[BlobInfo]:
+        return [BlobInfo(blob.name, str(blob.generation), blob.md5_hash)
+                for blob in self.bucket.client.list_blobs(self.bucket, prefix=prefix)]
+
+    def download(self, name: str, file_obj: BinaryIO):
+        self.bucket.blob(name).download_to_file(file_obj)
+
+
+class LocalDirectoryBackend(StorageBackend):
+    def __init__(self, directory: str):
+        """
+        Serves blobs from a local directory, standing in for GCS in tests
+        and air-gapped deployments. The generation of a blob is its
+        modification time.
+        """
+        self.directory = directory
+        self._md5_memo = {}
+
+    def __repr__(self):
+        return f"LocalDirectoryBackend({self.directory})"
+
+    def _blob_info_from_path(self, name: str, path: str) -> BlobInfo:
+        stat = os.stat(path)
+        memo_key = (path, stat.st_mtime_ns, stat.st_size)
+        if memo_key not in self._md5_memo:
+            self._md5_memo[memo_key] = _md5_of_file(path)
+        return BlobInfo(name, str(stat.st_mtime_ns), self._md5_memo[memo_key])
+
+    def get_blob_info(self, name: str) -> BlobInfo:
+        return self._blob_info_from_path(name, os.path.join(self.directory, name))
+
+    def list_blobs(self, prefix: str = "") -> list[BlobInfo]:
+        return [self._blob_info_from_path(name, os.path.join(self.directory, name))
+                for name in sorted(os.listdir(self.directory))
+                if name.startswith(prefix)
+                and os.path.isfile(os.path.join(self.directory, name))]
+
+    def download(self, name: str, file_obj: BinaryIO):
+        with open(os.path.join(self.directory, name), "rb") as f:
+            shutil.copyfileobj(f, file_obj, CHUNK_SIZE)
+
+
+def create_backend(config: dict) -> StorageBackend:
+    """
+    Creates a storage backend based on the [models] config section
+    """
+    match config["backend"]:
+        case "gcs":
+            return GCSBackend(config["bucket"])
+        case "local":
+            return LocalDirectoryBackend(config["local_dir"])
+        case _ as value:
+            raise ValueError(f"Storage backend {value} does not exist")
+
+
+class ModelCache:
+    def __init__(self, cache_dir: str, backend: StorageBackend,
+                 verify_cached: bool = True):
+        """
+        Local content-addressed cache of model blobs. Blobs are stored under
+        their MD5 digest and an index maps blob names to the cached version.
+
+        Args:
+            cache_dir (str): cache directory
+            backend (StorageBackend): source of the blobs
+            verify_cached (bool): recompute the checksum of a cached blob
+                                  before using it
+        """
+        self.cache_dir = cache_dir
+        self.backend = backend
+        self.verify_cached = verify_cached
+
+        self._objects_dir = os.path.join(cache_dir, "objects")
+        self._index_dir = os.path.join(cache_dir, "index")
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._index_dir, exist_ok=True)
+
+    def _object_path(self, md5: str) -> str:
+        return os.path.join(self._objects_dir, base64.b64decode(md5).hex())
+
+    def _index_path(self, name: str) -> str:
+        return os.path.join(self._index_dir, hashlib.sha1(name.encode()).hexdigest() + ".json")
+
+    def _read_index(self, name: str) -> BlobInfo | None:
+        try:
+            with open(self._index_path(name), "r") as f:
+                return BlobInfo(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _write_index(self, info: BlobInfo):
+        self._atomic_write(self._index_path(info.name),
+                           lambda f: f.write(json.dumps(info._asdict()).encode()))
+
+    def _atomic_write(self, path: str, write, validate=None):
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            if validate is not None:
+                validate(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _is_valid(self, info: BlobInfo) -> bool:
+        path = self._object_path(info.md5)
+        if not os.path.exists(path):
+            return False
+        return not self.verify_cached or _md5_of_file(path) == info.md5
+
+    def _download(self, info: BlobInfo) -> str:
+        def validate(tmp_path):
+            if _md5_of_file(tmp_path) != info.md5:
+                raise IOError(f"Checksum mismatch for downloaded blob {info.name}")
+
+        path = self._object_path(info.md5)
+        self._atomic_write(path, lambda f: self.backend.download(info.name, f), validate)
+        return path
+
+    def get_blob_info(self, name: str) -> BlobInfo:
+        """
+        Returns the current version of a blob in the backend, or the cached
+        version if the backend is unreachable
+        """
+        try:
+            return self.backend.get_blob_info(name)
+        except Exception as e:
+            cached_info = self._read_index(name)
+            if cached_info is None:
+                raise
+            _log.warning(f"Cannot reach {self.backend} ({e}), "
+                         f"using cached version of {name}")
+            return cached_info
+
+    def fetch(self, name: str, info: BlobInfo = None) -> str:
+        """
+        Returns a local path to the current version of a blob, downloading it
+        only if there is no valid cached copy
+
+        Args:
+            name (str): blob name
+            info (BlobInfo): version of the blob to fetch, if already known
+
+        Returns:
+            (str): path to the cached blob
+        """
+        info = info or self.get_blob_info(name)
+
+        if self._is_valid(info):
+            _log.info(f"Using cached {name} (generation {info.generation})")
+            path = self._object_path(info.md5)
+        else:
+            _log.info(f"Downloading {name} (generation {info.generation}) from {self.backend}")
+            path = self._download(info)
+
+        if self._read_index(name) != info:
+            self._write_index(info)
+        return path
+
+    def fetch_version(self, name: str, generation: str) -> str:
+        """
+        Returns a local path to a given generation of a blob, e.g. the one
+        another process has already fetched
+
+        Raises:
+            IOError: if the generation is neither cached nor in the backend
+        """
+        info = self._read_index(name)
+        if info is None or info.generation != generation:
+            info = next((blob_info for blob_info in self.backend.list_blobs(name)
+                         if blob_info.name == name and blob_info.generation == generation), None)
+        if info is None:
+            raise IOError(f"Generation {generation} of {name} is not available")
+        return self.fetch(name, info)
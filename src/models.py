@@ -14,6 +14,12 @@ class HouseModel(BaseModel):
     n_rooms: int | None
     build_year: int
 
+    model_config = {"json_schema_extra": {"examples": [{
+        "advert_type": "PRIVATE", "utc_created_at": "2024-02-10T12:00:00",
+        "province": "mazowieckie", "subregion": "powiat-warszawski-zachodni",
+        "location": "suburban", "market": "SECONDARY", "lot_area": 1000,
+        "house_area": 150, "n_rooms": 5, "build_year": 2010}]}}
+
 
 class ApartmentModel(BaseModel):
     advert_type: str
@@ -25,6 +31,11 @@ class ApartmentModel(BaseModel):
     n_rooms: int | None
     build_year: int
 
+    model_config = {"json_schema_extra": {"examples": [{
+        "advert_type": "PRIVATE", "utc_created_at": "2024-02-10T12:00:00",
+        "province": "mazowieckie", "subregion": "warszawa", "market": "SECONDARY",
+        "apartment_area": 55, "n_rooms": 3, "build_year": 1985}]}}
+
 
 class LandModel(BaseModel):
     advert_type: str
@@ -33,3 +44,20 @@ class LandModel(BaseModel):
     subregion: str | None = None
     location: str | None = None
     land_area: int | float
+
+    model_config = {"json_schema_extra": {"examples": [{
+        "advert_type": "PRIVATE", "utc_created_at": "2024-02-10T12:00:00",
+        "province": "malopolskie", "subregion": "krakowski", "location": "suburban",
+        "land_area": 1200}]}}
+
+
+PROPERTY_MODELS = {"apartments": ApartmentModel, "houses": HouseModel, "lands": LandModel}
+
+
+def get_example_record(property_type: str) -> dict:
+    """
+    Returns the documented example offer of a property type as a model record
+    """
+    model_class = PROPERTY_MODELS[property_type]
+    return model_class.model_validate(
+        model_class.model_config["json_schema_extra"]["examples"][0]).model_dump()
@@ -0,0 +1,236 @@
+import weakref
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+
+from features import FeatureVectorizer
+from forest import CompiledPipeline, CompiledForest
+from metrics import stage_timer
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+_vectorizers = weakref.WeakKeyDictionary()
+_compiled_forests = weakref.WeakKeyDictionary()
+# Inference threads build them at most once per model
+_build_lock = threading.Lock()
+
+
+def get_vectorizer(model) -> FeatureVectorizer:
+    """
+    Returns the feature vectorizer of a model, building it once per
+    sklearn pipeline
+    """
+    if isinstance(model, CompiledPipeline):
+        return model.preprocessor
+    if model not in _vectorizers:
+        with _build_lock:
+            if model not in _vectorizers:
+                _vectorizers[model] = FeatureVectorizer.from_pipeline(model)
+    return _vectorizers[model]
+
+
+def get_regressor(model):
+    return model.forest if isinstance(model, CompiledPipeline) else model[-1]
+
+
+def get_compiled_forest(model) -> CompiledForest:
+    """
+    Returns the compiled forest of a model, compiling the regressor of
+    a sklearn pipeline unless `prepare_model` already did
+    """
+    if isinstance(model, CompiledPipeline):
+        return model.forest
+    if model not in _compiled_forests:
+        with _build_lock:
+            if model not in _compiled_forests:
+                _compiled_forests[model] = CompiledForest.from_estimator(model[-1])
+    return _compiled_forests[model]
+
+
+def prepare_model(model):
+    """
+    Builds the vectorizer and the compiled forest used for intervals and
+    explanations of a sklearn pipeline, so that they are built when the
+    model is loaded, e.g. before the server forks its workers, rather than
+    on the first request
+    """
+    get_vectorizer(model)
+    get_compiled_forest(model)
+    return model
+
+
+def parse_quantiles(intervals: str) -> list[float]:
+    """
+    Parses a comma separated list of quantiles, e.g. "0.05,0.95"
+    """
+    try:
+        quantiles = [float(q) for q in intervals.split(",")]
+    except ValueError:
+        raise ValueError(f"Invalid quantiles: {intervals}")
+    if not quantiles or any(not 0 <= q <= 1 for q in quantiles):
+        raise ValueError(f"Quantiles must be between 0 and 1, got {intervals}")
+    return quantiles
+
+
+def records_to_dataframe(records: list[dict]) -> "pd.DataFrame":
+    """
+    Builds a model input frame from a list of offer records
+    """
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(records, index=range(len(records)))
+    df["utc_created_at"] = pd.to_datetime(df["utc_created_at"])
+    return df
+
+
+def predict_records(model, records: list[dict]) -> list[float]:
+    """
+    Estimates prices of all records with a single model call
+    """
+    if not records:
+        return []
+    with stage_timer("features"):
+        X = get_vectorizer(model).transform_records(records)
+    with stage_timer("model"):
+        return get_regressor(model).predict(X).tolist()
+
+
+def predict_records_with_details(model, records: list[dict], quantiles: list[float] = None,
+                                 explain: bool = False) -> list[dict]:
+    """
+    Estimates prices of all records on the compiled forest, optionally with
+    quantiles of the per-tree predictions and feature contributions
+
+    Args:
+        model: fitted pipeline
+        records (list[dict]): validated offer records
+        quantiles (list[float]): quantiles to return as `intervals`
+        explain (bool): whether to return the `explanation` of each price,
+                        made of the bias and non-zero feature contributions
+
+    Returns:
+        (list[dict]): `result` and the requested details per record
+    """
+    if not records:
+        return []
+    vectorizer = get_vectorizer(model)
+    forest = get_compiled_forest(model)
+    with stage_timer("features"):
+        X = vectorizer.transform_records(records)
+
+    if quantiles is None:
+        with stage_timer("model"):
+            means = forest.predict(X)
+        results = [{"result": mean} for mean in means.tolist()]
+    else:
+        with stage_timer("model"):
+            means, bands = forest.predict_quantiles(X, quantiles)
+        keys = [str(q) for q in quantiles]
+        results = [{"result": mean, "intervals": dict(zip(keys, band))}
+                   for mean, band in zip(means.tolist(), bands.tolist())]
+
+    if explain:
+        feature_names = vectorizer.feature_names
+        with stage_timer("explain"):
+            bias, contributions = forest.predict_contributions(X)
+        for result, row_bias, row in zip(results, bias.tolist(), contributions):
+            nonzero = np.flatnonzero(row)
+            nonzero = nonzero[np.argsort(-np.abs(row[nonzero]))]
+            result["explanation"] = {
+                "bias": row_bias,
+                "contributions": {feature_names[idx]: float(row[idx]) for idx in nonzero},
+            }
+
+    return results
+
+
+def predict_columns(model, columns: dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Estimates prices of column-oriented offers with a single model call
+    """
+    with stage_timer("features"):
+        X = get_vectorizer(model).transform_columns(columns)
+    with stage_timer("model"):
+        return get_regressor(model).predict(X)
+
+
+def validate_items(items: list[dict],
+                   model_class: type[BaseModel]) -> (list[dict], list[dict]):
+    """
+    Validates raw batch items against a pydantic model one by one
+
+    Args:
+        items (list[dict]): raw items from the request body
+        model_class (type[BaseModel]): model describing a single offer
+
+    Returns:
+        (list[dict]): validated records of the correct items
+        (list[dict]): per-item results, with messages for the invalid items
+                      and None placeholders for the valid ones
+    """
+    records = []
+    results = []
+    for item in items:
+        try:
+            records.append(model_class.model_validate(item).model_dump())
+            results.append(None)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                               for error in e.errors())
+            results.append({"message": f"Invalid offer: {errors}"})
+
+    return records, results
+
+
+def predict_batch(model, items: list[dict],
+                  model_class: type[BaseModel],
+                  quantiles: list[float] = None) -> list[dict]:
+    """
+    Estimates prices of a batch of raw items with one vectorized prediction.
+    Errors are reported per item and do not fail the whole batch.
+
+    Args:
+        model: fitted pipeline
+        items (list[dict]): raw items from the request body
+        model_class (type[BaseModel]): model describing a single offer
+        quantiles (list[float]): quantiles of per-tree predictions to return
+                                 as `intervals`, if given
+
+    Returns:
+        (list[dict]): results in the order of `items`, each holding either
+                      a `result` or a `message` key
+    """
+    with stage_timer("validate"):
+        records, results = validate_items(items, model_class)
+
+    def predict(records_to_predict):
+        if quantiles is None:
+            return [{"result": price} for price in predict_records(model, records_to_predict)]
+        return predict_records_with_details(model, records_to_predict, quantiles)
+
+    try:
+        prices = predict(records)
+    except Exception:
+        prices = []
+        for record in records:
+            try:
+                prices.append(predict([record])[0])
+            except Exception as e:
+                prices.append(e)
+
+    prices = iter(prices)
+    for idx, result in enumerate(results):
+        if result is not None:
+            continue
+
+        price = next(prices)
+        if isinstance(price, Exception):
+            results[idx] = {"message": f"An error occured during the model prediction: {price}"}
+        else:
+            results[idx] = price
+
+    return results
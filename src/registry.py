@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from dataclasses import dataclass
+from collections.abc import Callable
+
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadedModel:
+    model: object
+    version: str
+    loaded_at: datetime
+
+    def to_dict(self):
+        return {"version": self.version, "loaded_at": self.loaded_at.isoformat()}
+
+
+class ModelRegistry:
+    def __init__(self):
+        """
+        Holds the current model of each property type. Models are replaced
+        by swapping a single reference, so a request sees either the old or
+        the new model and in-flight predictions finish on the model they got.
+        """
+        self._current = {}
+        self._previous = {}
+        self._listeners = []
+
+    def __contains__(self, property_type):
+        return property_type in self._current
+
+    def get(self, property_type: str):
+        return self._current[property_type].model
+
+    def get_version(self, property_type: str) -> str | None:
+        loaded_model = self._current.get(property_type)
+        return loaded_model.version if loaded_model else None
+
+    def get_versions(self) -> dict[str, str]:
+        return {property_type: loaded_model.version
+                for property_type, loaded_model in self._current.items()}
+
+    def add_listener(self, listener: Callable[[str, LoadedModel | None, LoadedModel], None]):
+        """
+        Registers a callback called with (property_type, old, new) after a swap
+        """
+        self._listeners.append(listener)
+
+    def swap(self, property_type: str, model, version: str):
+        new = LoadedModel(model, version, datetime.now(tz=timezone.utc))
+        old = self._current.get(property_type)
+        self._current[property_type] = new
+        if old is not None:
+            self._previous[property_type] = old
+
+        _log.info(f"Model of {property_type} swapped: "
+                  f"{old.version if old else None} -> {version}")
+        for listener in self._listeners:
+            listener(property_type, old, new)
+
+    def status(self) -> dict:
+        return {
+            property_type: {
+                "current": current.to_dict(),
+                "previous": (self._previous[property_type].to_dict()
+                             if property_type in self._previous else None),
+            }
+            for property_type, current in self._current.items()
+        }
+
+
+class ModelReloader:
+    def __init__(self,
+                 registry: ModelRegistry,
+                 load_fn: Callable[[str], tuple[object, str]],
+                 get_version_fn: Callable[[str], str],
+                 warmup_fn: Callable[[str, object], None],
+                 property_types: list[str],
+                 interval: float):
+        """
+        Background task polling for new model versions. A new version is
+        loaded and warmed up in a thread, off the request path, and then
+        swapped into the registry.
+
+        Args:
+            registry (ModelRegistry): registry to update
+            load_fn (Callable): loads a property type model, returns
+                                the model and its version
+            get_version_fn (Callable): returns the current version available
+                                       in storage for a property type
+            warmup_fn (Callable): runs a prediction on a freshly loaded model
+            property_types (list[str]): property types to watch
+            interval (float): number of seconds between checks
+        """
+        self.registry = registry
+        self.load_fn = load_fn
+        self.get_version_fn = get_version_fn
+        self.warmup_fn = warmup_fn
+        self.property_types = property_types
+        self.interval = interval
+
+        self.last_checked_at = None
+        self.last_errors = {}
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check_all()
+
+    async def check_all(self):
+        for property_type in self.property_types:
+            try:
+                await self.check(property_type)
+                self.last_errors.pop(property_type, None)
+            except Exception as e:
+                self.last_errors[property_type] = str(e)
+                _log.exception(e)
+        self.last_checked_at = datetime.now(tz=timezone.utc)
+
+    async def check(self, property_type: str) -> bool:
+        """
+        Reloads the model of a property type if a new version is available.
+        Property types without a loaded model are skipped.
+
+        Returns:
+            (bool): whether the model was swapped
+        """
+        if property_type not in self.registry:
+            return False  # not loaded yet, e.g. with lazy loading
+
+        available_version = await asyncio.to_thread(self.get_version_fn, property_type)
+        if available_version == self.registry.get_version(property_type):
+            return False
+
+        _log.info(f"New {property_type} model version found: {available_version}")
+        model, version = await asyncio.to_thread(self.load_fn, property_type)
+        await asyncio.to_thread(self.warmup_fn, property_type, model)
+        self.registry.swap(property_type, model, version)
+        return True
+
+    def status(self) -> dict:
+        return {
+            "interval": self.interval,
+            "running": self._task is not None and not self._task.done(),
+            "last_checked_at": self.last_checked_at.isoformat() if self.last_checked_at else None,
+            "last_errors": self.last_errors,
+        }
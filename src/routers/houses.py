@@ -1,33 +1,104 @@
-from fastapi import APIRouter, status
-from fastapi.responses import JSONResponse
-import pandas as pd
-
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from streaming import (stream_as_completed, stream_scored_upload, get_upload_format,
+                       spool_upload, NDJSON_MEDIA_TYPE, UPLOAD_MEDIA_TYPES)
+from prediction import parse_quantiles
+from admission import overloaded_response
+from exceptions import ServiceOverloaded, InvalidUpload
 from models import HouseModel
 
 
-router = APIRouter()
+async def require_model():
+    from main import property_type_loader
+    try:
+        await property_type_loader.ensure_model("houses")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+router = APIRouter(dependencies=[Depends(require_model)])
+
+
+def get_predictor():
+    from main import houses_predictor
+    return houses_predictor
+
+
+def get_executor():
+    from main import inference_executor
+    return inference_executor
+
+
+async def get_scraper():
+    from main import property_type_loader
+    return await property_type_loader.ensure_scraper("houses")
 
 
-def get_model():
-    from main import houses_model
-    return houses_model
+def get_host_limiter():
+    from main import offer_host_limiter
+    return offer_host_limiter
+
+
+def get_admission_controllers():
+    from main import otodom_offer_admission, otodom_offers_admission
+    return otodom_offer_admission, otodom_offers_admission
+
+
+def get_offer_cache():
+    from main import houses_offer_cache
+    return houses_offer_cache
+
+
+def offer_to_json(offer) -> dict:
+    return {
+        "advert_type": offer.advert_type,
+        "utc_created_at": offer.utc_created_at,
+        "province": offer.province,
+        "subregion": offer.subregion,
+        "location": offer.location,
+        "market": offer.market,
+        "lot_area": offer.lot_area,
+        "house_area": offer.house_area,
+        "n_rooms": offer.n_rooms,
+        "build_year": offer.build_year,
+    }
 
 
-def get_scraper():
-    from main import houses_scraper
-    return houses_scraper
+async def scrape_offer(url: str):
+    scraper = await get_scraper()
+    offer_cache = get_offer_cache()
+    if offer_cache is None:
+        return await scraper.scrape_offer_from_url_async(url)
+    return await offer_cache.get(url, scraper.scrape_offer_from_url_async)
 
 
 @router.post("/houses/from-json", tags=["houses"])
-async def estimate_price_from_json(body: HouseModel):
+async def estimate_price_from_json(body: HouseModel, intervals: str | None = None,
+                                   explain: bool = False):
     data = body.model_dump()
-    model = get_model()
 
-    df = pd.DataFrame(data, index=[0])
-    df["utc_created_at"] = pd.to_datetime(df["utc_created_at"])
+    if intervals is not None or explain:
+        try:
+            quantiles = parse_quantiles(intervals) if intervals is not None else None
+        except ValueError as e:
+            return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"message": str(e)})
+
+        executor = get_executor()
+        try:
+            [message] = await executor.run("houses", "predict_records_with_details", [data],
+                                           quantiles, explain)
+        except Exception as e:
+            message = {"message": f"An error occured during the model prediction: {e}"}
+            return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=message)
+
+        return JSONResponse(status_code=status.HTTP_200_OK, content=message)
+
+    predictor = get_predictor()
 
     try:
-        price = model.predict(df)[0]
+        price = await predictor.predict(data)
     except Exception as e:
         message = {"message": f"An error occured during the model prediction: {e}"}
         return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=message)
@@ -36,35 +107,135 @@ async def estimate_price_from_json(body: HouseModel):
     return JSONResponse(status_code=status.HTTP_200_OK, content=message)
 
 
+@router.post("/houses/from-json/batch", tags=["houses"])
+async def estimate_prices_from_json_batch(body: list[dict], intervals: str | None = None):
+    try:
+        quantiles = parse_quantiles(intervals) if intervals is not None else None
+    except ValueError as e:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"message": str(e)})
+
+    executor = get_executor()
+    try:
+        results = await executor.run("houses", "predict_batch", body, HouseModel, quantiles)
+    except Exception as e:
+        message = {"message": f"An error occured during the model prediction: {e}"}
+        return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=message)
+
+    message = {"results": results}
+    return JSONResponse(status_code=status.HTTP_200_OK, content=message)
+
+
+@router.post("/houses/from-arrow", tags=["houses"])
+async def estimate_prices_from_arrow(request: Request):
+    from columnar import read_arrow_stream, table_to_columns, prices_to_arrow_stream, ARROW_STREAM_MEDIA_TYPE
+
+    body = await request.body()
+    try:
+        table = await run_in_threadpool(read_arrow_stream, body)
+        columns = await run_in_threadpool(table_to_columns, table, HouseModel)
+    except Exception as e:
+        message = {"message": f"Invalid Arrow stream: {e}"}
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content=message)
+
+    executor = get_executor()
+    try:
+        prices = await executor.run("houses", "predict_columns", columns)
+    except Exception as e:
+        message = {"message": f"An error occured during the model prediction: {e}"}
+        return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=message)
+
+    return Response(content=prices_to_arrow_stream(prices), media_type=ARROW_STREAM_MEDIA_TYPE)
+
+
+@router.post("/houses/from-file", tags=["houses"])
+async def estimate_prices_from_file(request: Request):
+    from main import bulk_config
+
+    file_format = get_upload_format(request.headers.get("content-type"))
+    if file_format is None:
+        message = {"message": "Unsupported content type, use text/csv or application/x-ndjson"}
+        return JSONResponse(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, content=message)
+
+    try:
+        upload = await spool_upload(request.stream(), bulk_config["max_upload_bytes"],
+                                    bulk_config["max_line_bytes"], bulk_config["spool_memory_bytes"])
+    except InvalidUpload as e:
+        return JSONResponse(status_code=e.status_code, content={"message": str(e)})
+
+    executor = get_executor()
+
+    async def score_chunk(items):
+        try:
+            return await executor.run("houses", "predict_batch", items, HouseModel)
+        except Exception as e:
+            message = f"An error occured during the model prediction: {e}"
+            return [{"message": message} for _ in items]
+
+    return StreamingResponse(
+        stream_scored_upload(upload, file_format, score_chunk, bulk_config["chunk_size"]),
+        media_type=UPLOAD_MEDIA_TYPES[file_format])
+
+
 @router.get("/houses/from-otodom-offer", tags=["houses"])
-def estimate_price_from_otodom_offer(url: str):
-    scraper = get_scraper()
+async def estimate_price_from_otodom_offer(url: str):
+    admission, _ = get_admission_controllers()
+    try:
+        async with admission.admit():
+            return await _estimate_price_from_otodom_offer(url)
+    except ServiceOverloaded as e:
+        return overloaded_response(e)
+
+
+async def _estimate_price_from_otodom_offer(url: str):
     try:
-        offer = scraper.scrape_offer_from_url(url)
+        offer = await scrape_offer(url)
     except Exception as e:
         message = {"message": f"An error occured during the offer scraping: {e}"}
         return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=message)
 
-    offer_json = {
-        "advert_type": offer.advert_type,
-        "utc_created_at": offer.utc_created_at,
-        "province": offer.province,
-        "subregion": offer.subregion,
-        "location": offer.location,
-        "market": offer.market,
-        "lot_area": offer.lot_area,
-        "house_area": offer.house_area,
-        "n_rooms": offer.n_rooms,
-        "build_year": offer.build_year,
-    }
-    offer_df = pd.DataFrame(offer_json, index=[0])
-    model = get_model()
+    offer_json = offer_to_json(offer)
+    predictor = get_predictor()
 
     try:
-        price = model.predict(offer_df)[0]
+        price = await predictor.predict(offer_json)
     except Exception as e:
         message = {"message": f"An error occured during the model prediction: {e}"}
         return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=message)
 
     message = {"result": price}
     return JSONResponse(status_code=status.HTTP_200_OK, content=message)
+
+
+@router.post("/houses/from-otodom-offers", tags=["houses"])
+async def estimate_prices_from_otodom_offers(urls: list[str]):
+    from main import bulk_config
+
+    if len(urls) > bulk_config["max_urls"]:
+        message = {"message": f"Too many urls, at most {bulk_config['max_urls']} are allowed"}
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content=message)
+
+    host_limiter = get_host_limiter()
+    predictor = get_predictor()
+
+    async def estimate(url):
+        try:
+            async with host_limiter.limit(url):
+                offer = await scrape_offer(url)
+        except Exception as e:
+            return {"url": url, "message": f"An error occured during the offer scraping: {e}"}
+
+        try:
+            price = await predictor.predict(offer_to_json(offer))
+        except Exception as e:
+            return {"url": url, "message": f"An error occured during the model prediction: {e}"}
+
+        return {"url": url, "result": price}
+
+    _, admission = get_admission_controllers()
+    try:
+        await admission.acquire()
+    except ServiceOverloaded as e:
+        return overloaded_response(e)
+
+    return StreamingResponse(admission.release_after(stream_as_completed(urls, estimate)),
+                             media_type=NDJSON_MEDIA_TYPE)
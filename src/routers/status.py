@@ -0,0 +1,82 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from metrics import render_metrics
+
+
+router = APIRouter()
+
+
+@router.get("/status/batching", tags=["status"])
+async def get_batching_status():
+    from main import apartments_batcher, houses_batcher, lands_batcher
+
+    message = {
+        property_type: {
+            "config": {
+                "max_batch_size": batcher.max_batch_size,
+                "max_wait_ms": batcher.max_wait_ms,
+                "flush_when_idle": batcher.flush_when_idle,
+            },
+            "stats": batcher.stats.to_dict()
+        }
+        for property_type, batcher in [("apartments", apartments_batcher),
+                                       ("houses", houses_batcher),
+                                       ("lands", lands_batcher)]
+    }
+    return JSONResponse(status_code=status.HTTP_200_OK, content=message)
+
+
+@router.get("/status/models", tags=["status"])
+async def get_models_status():
+    from main import model_registry, model_reloader
+
+    message = {"models": model_registry.status(), "reloader": model_reloader.status()}
+    return JSONResponse(status_code=status.HTTP_200_OK, content=message)
+
+
+@router.get("/status/cache", tags=["status"])
+async def get_cache_status():
+    from main import predictors
+
+    message = {
+        property_type: predictor.cache.stats() if predictor.cache else None
+        for property_type, predictor in predictors.items()
+    }
+    return JSONResponse(status_code=status.HTTP_200_OK, content=message)
+
+
+@router.get("/status/offer-cache", tags=["status"])
+async def get_offer_cache_status():
+    from main import apartments_offer_cache, houses_offer_cache, lands_offer_cache
+
+    message = {
+        property_type: offer_cache.stats() if offer_cache else None
+        for property_type, offer_cache in [("apartments", apartments_offer_cache),
+                                           ("houses", houses_offer_cache),
+                                           ("lands", lands_offer_cache)]
+    }
+    return JSONResponse(status_code=status.HTTP_200_OK, content=message)
+
+
+@router.get("/status/admission", tags=["status"])
+async def get_admission_status():
+    from main import otodom_offer_admission, otodom_offers_admission
+
+    message = {admission.name: admission.stats()
+               for admission in [otodom_offer_admission, otodom_offers_admission]}
+    return JSONResponse(status_code=status.HTTP_200_OK, content=message)
+
+
+@router.get("/metrics", tags=["status"], response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/ready", tags=["status"])
+async def get_readiness():
+    from main import property_type_loader
+
+    message = {"ready": property_type_loader.is_ready(), "property_types": property_type_loader.status()}
+    status_code = status.HTTP_200_OK if message["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code, content=message)
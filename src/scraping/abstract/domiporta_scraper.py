@@ -1,8 +1,8 @@
+import functools
 from abc import ABC, abstractmethod
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
-from utils.general import random_sleep
 from scraping.abstract.property_scraper import PropertyScraper
 from scraping import Services
 from data.models.domiporta import DomiportaOffer
@@ -43,15 +43,38 @@ class DomiportaScraper(PropertyScraper, ABC):
         """
         Takes a URL to an offer and returns a data model for that offer
         """
-        response = self._request_http_get(url,
-                                          headers=self._generate_headers())
+        response = self._request_http_get(url)
         offer_soup = self._make_soup(response)
         offer_data_model = self._parse_offer_soup(offer_soup)
         return offer_data_model
 
+    def _get_offers_urls_from_search_page(self, search_params: dict,
+                                          page_number: int,
+                                          windowed: bool = False) -> list[str]:
+        """
+        Requests a single page of search results and returns offers urls
+        """
+        search_url = urljoin(self.BASE_URL, self.SUB_URL)
+        search_response = self._request_http_get(
+            search_url, params={**search_params, "PageNumber": page_number},
+            windowed=windowed)
+
+        self._log.debug(f"Requested search url: {search_response.url} ")
+
+        search_soup = self._make_soup(search_response)
+        try:
+            page_urls_list = self._get_offers_urls_from_single_search_page(
+                search_soup)
+        except Exception as e:
+            self._log.exception(e)
+            page_urls_list = []
+
+        self._log.debug(f"Got {len(page_urls_list)} urls from search page")
+        return page_urls_list
+
     def list_offers_urls_from_search_params(
             self, search_params: dict, n_pages: int,
-            avg_sleep_time: int = 3) -> (list[str], list[int]):
+            window: int = 1) -> (list[str], list[int]):
         """
         Based on complete dict of search filters (default and custom)
         and `n_pages` to scrape returns a list of urls from all those pages.
@@ -59,45 +82,20 @@ class DomiportaScraper(PropertyScraper, ABC):
         Args:
             search_params (dict): default and custom filters
             n_pages (int): number of pages to search
-            avg_sleep_time (int): avg. n. of secs. to sleep between requests
+            window (int): number of pages requested concurrently. With more
+                          than one page searching also ends on a page
+                          shorter than `RowsPerPage`.
 
         Returns:
-            (list[str]): list of urls to offers from all N pages
+            (list[str]): list of unique urls to offers from all N pages,
+                         in the order of pages
             (list[int]): number of urls aquired from subsequent pages
         """
-        all_urls_list = []
-        n_of_urls_from_pages = []
-        self._log.debug(f"About to scrape {n_pages} pages")
-        for page_number in range(1, n_pages + 1):
-            random_sleep(avg_sleep_time)
-            random_headers = self._generate_headers()
-            search_url = urljoin(self.BASE_URL, self.SUB_URL)
-            search_params.update({"PageNumber": page_number})
-
-            search_response = self._request_http_get(search_url,
-                                                     headers=random_headers,
-                                                     params=search_params)
-
-            self._log.debug(f"Requested search url: {search_response.url} ")
-
-            search_soup = self._make_soup(search_response)
-            try:
-                page_urls_list = self._get_offers_urls_from_single_search_page(
-                    search_soup)
-                n_of_urls_from_pages.append(len(page_urls_list))
-            except Exception as e:
-                self._log.exception(e)
-                page_urls_list = []
-
-            self._log.debug(f"Got {len(page_urls_list)} urls from search page")
-
-            all_urls_list.extend(page_urls_list)
-
-            if not page_urls_list:
-                self._log.warning("No urls found on a search page. "
-                                  "Searching aborted")
-                break
-
-        self._log.info(f"Found {len(all_urls_list)} urls from search params. "
-                       f"{len(list(set(all_urls_list)))} are unique")
-        return list(set(all_urls_list)), n_of_urls_from_pages
+        pages = self._search_pages(
+            functools.partial(self._get_offers_urls_from_search_page, search_params),
+            n_pages, window,
+            page_size=int(search_params.get("RowsPerPage", 0)))
+
+        all_urls_list = [url for page_urls_list in pages for url in page_urls_list]
+        n_of_urls_from_pages = [len(page_urls_list) for page_urls_list in pages]
+        return self._get_unique_urls(all_urls_list), n_of_urls_from_pages
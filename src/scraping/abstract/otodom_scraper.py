@@ -1,20 +1,34 @@
+import functools
 import json
+from dataclasses import fields
 from urllib.parse import urljoin
 from abc import ABC, abstractmethod
 from urllib.parse import urljoin
+from datetime import datetime, timezone
 from bs4 import BeautifulSoup
 
-from utils.general import random_sleep
 from scraping.abstract.property_scraper import PropertyScraper
 from scraping import Services
+from utils.general import smart_cast, smart_slice
 from data.models.otodom import OtodomOffer
 
 
+ROOMS_NUMBERS = {"ONE": 1, "TWO": 2, "THREE": 3, "FOUR": 4, "FIVE": 5,
+                 "SIX": 6, "SEVEN": 7, "EIGHT": 8, "NINE": 9, "TEN": 10}
+
+
 class OtodomScraper(PropertyScraper, ABC):
     SERVICE_NAME: str = Services.OTODOM.value
     BASE_URL: str = "https://www.otodom.pl/"
     OFFER_BASE_URL: str = "https://www.otodom.pl/pl/oferta/"
     SUB_URL: None
+    # Fields an offer from search results must have to be harvested: ids,
+    # the price and features of the price models found in search results
+    SEARCH_REQUIRED_FIELDS: list[str] = ["number_id", "price", "advertiser_type",
+                                         "utc_created_at", "province", "subregion"]
+    # Features of the price models not always found in search results,
+    # filled in from the offer page of a harvested offer
+    BACKFILL_FIELDS: list[str] = ["advert_type"]
 
     def __init__(self, scraper_name: str):
         super().__init__(scraper_name)
@@ -33,16 +47,18 @@ class OtodomScraper(PropertyScraper, ABC):
         offer_json = offer_full_json["props"]["pageProps"]["ad"]
         return offer_json
 
-    def _get_offers_urls_from_single_search_page(
-            self, search_page_soup: BeautifulSoup) -> list[str]:
+    def _get_offers_items_from_single_search_page(
+            self, search_page_soup: BeautifulSoup) -> list[dict]:
         """
-        Scrapes a single page of search results and returns offers urls
+        Scrapes a single page of search results and returns raw offers data
+        (JSON items of `searchAds`), including items without an offer url
+        such as promoted ones, so a full page is never mistaken for the last
 
         Args:
             search_page_soup (BeautifulSoup): bs4 soup of a single search page
 
         Returns:
-            (list[str]): list of urls found on the search page
+            (list[dict]): offers items found on the search page
         """
         all_scripts = search_page_soup.find_all("script",
                                                 {"type": "application/json"})
@@ -61,25 +77,160 @@ class OtodomScraper(PropertyScraper, ABC):
             self._log.warning("Offers search JSON invalid (keys not found)")
             return []
 
-        offers_slugs = [offer["slug"] for offer in offers_list]
-        offers_urls = [urljoin(self.OFFER_BASE_URL, slug)
-                       for slug in offers_slugs]
+        return offers_list
+
+    def _get_offers_urls_from_single_search_page(
+            self, search_page_soup: BeautifulSoup) -> list[str]:
+        """
+        Scrapes a single page of search results and returns offers urls
+
+        Args:
+            search_page_soup (BeautifulSoup): bs4 soup of a single search page
+
+        Returns:
+            (list[str]): list of urls found on the search page
+        """
+        offers_list = self._get_offers_items_from_single_search_page(
+            search_page_soup)
+        return self._get_offers_urls(offers_list)
+
+    def _get_offer_url(self, offer_item: dict) -> str:
+        return urljoin(self.OFFER_BASE_URL, offer_item["slug"])
+
+    def _get_offers_urls(self, offers_items: list[dict]) -> list[str]:
+        """
+        Returns urls of offers items, skipping items without an offer url
+        """
+        return [self._get_offer_url(offer_item) for offer_item in offers_items
+                if offer_item.get("slug")]
+
+    def _get_search_item_fields(self, offer_item: dict) -> dict:
+        """
+        Takes raw data of an offer from search results and returns fields
+        common to all Otodom offers. Fields missing in the search results
+        are set to None.
+        """
+        address = offer_item.get("location", {}).get("address", {})
+        province = (address.get("province") or {}).get("code")
+        subregion = (address.get("county") or {}).get("code")
+        if province is None or subregion is None:
+            # Location ids look like "province/county/commune/city"
+            locations = (offer_item.get("location", {}).get("reverseGeocoding")
+                         or {}).get("locations") or []
+            location_ids = [location["id"].split("/") for location in locations
+                            if location.get("id")]
+            if location_ids:
+                location_id = max(location_ids, key=len)
+                province = province or location_id[0]
+                subregion = subregion or smart_slice(location_id, 1)
+
+        total_price = offer_item.get("totalPrice") or {}
+        created_at = offer_item.get("dateCreatedFirst") or offer_item.get("dateCreated")
+        # Same values as "advertiserType" of an offer page: private,
+        # agency or developer
+        if offer_item.get("isPrivateOwner"):
+            advertiser_type = "private"
+        else:
+            agency_type = (offer_item.get("agency") or {}).get("type")
+            advertiser_type = agency_type.lower() if isinstance(agency_type, str) else None
+
+        return {
+            "number_id": offer_item.get("id"),
+            "short_id": offer_item.get("publicId"),
+            "long_id": offer_item["slug"],
+            "url": self._get_offer_url(offer_item),
+            "title": offer_item.get("title"),
+            "price": smart_cast(total_price.get("value"), int),
+            "advertiser_type": advertiser_type,
+            "advert_type": offer_item.get("advertType") or (
+                "PRIVATE" if offer_item.get("isPrivateOwner") else None),
+            "utc_created_at": (datetime.fromisoformat(created_at).replace(tzinfo=None)
+                               if created_at else None),
+            "utc_scraped_at": datetime.now(tz=timezone.utc),
+            "city": (address.get("city") or {}).get("name"),
+            "subregion": subregion,
+            "province": province,
+        }
+
+    @staticmethod
+    def _get_search_item_market(offer_item: dict) -> str | None:
+        """
+        Returns the market of an offer from search results. Only offers of
+        developments (investments) are known to be on the primary market.
+        """
+        if offer_item.get("developmentId") or offer_item.get("investmentState"):
+            return "PRIMARY"
+        return None
+
+    @staticmethod
+    def _convert_rooms_number(rooms_number: str | int | None) -> int | None:
+        """
+        Converts the number of rooms from search results ("THREE") to int
+        """
+        if isinstance(rooms_number, int):
+            return rooms_number
+        return ROOMS_NUMBERS.get(rooms_number)
+
+    @abstractmethod
+    def _parse_search_item(self, offer_item: dict) -> OtodomOffer:
+        """
+        Creates a partial offer data model from raw data of an offer found
+        in search results
+        """
+        raise NotImplementedError
 
-        return offers_urls
+    def get_missing_fields(self, offer: OtodomOffer) -> list[str]:
+        """
+        Returns `BACKFILL_FIELDS` missing in a harvested offer
+        """
+        return [field for field in self.BACKFILL_FIELDS if getattr(offer, field) is None]
+
+    def backfill_offer(self, offer: OtodomOffer) -> OtodomOffer:
+        """
+        Takes a harvested offer, requests its page and fills in the fields
+        missing in search results. Fields found in search results are kept.
+        """
+        page_offer = self.scrape_offer_from_url(offer.url)
+        for field in fields(offer):
+            if getattr(offer, field.name) is None:
+                setattr(offer, field.name, getattr(page_offer, field.name))
+        return offer
 
     def scrape_offer_from_url(self, url: str) -> OtodomOffer:
         """
         Takes a URL to an offer and returns a data model for that offer
         """
-        response = self._request_http_get(url,
-                                          headers=self._generate_headers())
+        response = self._request_http_get(url)
         offer_soup = self._make_soup(response)
         offer_data_model = self._parse_offer_soup(offer_soup)
         return offer_data_model
 
+    def _get_offers_items_from_search_page(self, search_params: dict,
+                                           page_number: int,
+                                           windowed: bool = False) -> list[dict]:
+        """
+        Requests a single page of search results and returns raw offers data
+        """
+        search_url = urljoin(self.BASE_URL, self.SUB_URL)
+        search_response = self._request_http_get(
+            search_url, params={**search_params, "page": page_number}, windowed=windowed)
+
+        self._log.debug(f"Requested search url: {search_response.url} ")
+
+        search_soup = self._make_soup(search_response)
+        try:
+            page_items_list = self._get_offers_items_from_single_search_page(
+                search_soup)
+        except Exception as e:
+            self._log.exception(e)
+            page_items_list = []
+
+        self._log.debug(f"Got {len(page_items_list)} items from search page")
+        return page_items_list
+
     def list_offers_urls_from_search_params(
             self, search_params: dict, n_pages: int,
-            avg_sleep_time: int = 3) -> (list[str], list[int]):
+            window: int = 1) -> (list[str], list[int]):
         """
         Based on complete dict of search filters (default and custom)
         and `n_pages` to scrape returns a list of urls from all those pages.
@@ -87,47 +238,77 @@ class OtodomScraper(PropertyScraper, ABC):
         Args:
             search_params (dict): default and custom filters
             n_pages (int): number of pages to search
-            avg_sleep_time (int): avg. n. of secs. to sleep between requests
+            window (int): number of pages requested concurrently. With more
+                          than one page searching also ends on a page
+                          shorter than `limit`.
 
         Returns:
-            (list[str]): list of urls to offers from all N pages
+            (list[str]): list of unique urls to offers from all N pages,
+                         in the order of pages
             (list[int]): number of urls aquired from subsequent pages
         """
-        search_params = search_params.copy()
+        # The end of results is judged by the number of raw items on a page
+        pages = self._search_pages(
+            functools.partial(self._get_offers_items_from_search_page, search_params),
+            n_pages, window,
+            page_size=int(search_params.get("limit", 0)))
+        pages = [self._get_offers_urls(page_items_list) for page_items_list in pages]
+
+        all_urls_list = [url for page_urls_list in pages for url in page_urls_list]
+        n_of_urls_from_pages = [len(page_urls_list) for page_urls_list in pages]
+        return self._get_unique_urls(all_urls_list), n_of_urls_from_pages
+
+    def harvest_offers_from_search_params(
+            self, search_params: dict, n_pages: int,
+            window: int = 1,
+            required_fields: list[str] = None) -> (list[OtodomOffer], list[str], list[int]):
+        """
+        Builds partial offers straight from search results, without
+        requesting offer pages. Offers missing any of `required_fields` in
+        the search results are returned as urls, to be scraped in full.
+        Offers missing any of `BACKFILL_FIELDS` are returned as well, to be
+        completed with `backfill_offer`.
 
-        all_urls_list = []
-        n_of_urls_from_pages = []
-        self._log.debug(f"About to scrape {n_pages} pages")
-        for page_number in range(1, n_pages + 1):
-            random_sleep(avg_sleep_time)
-            random_headers = self._generate_headers()
-            search_url = urljoin(self.BASE_URL, self.SUB_URL)
-            search_params.update({"page": page_number})
+        Args:
+            search_params (dict): default and custom filters
+            n_pages (int): number of pages to search
+            window (int): number of pages requested concurrently
+            required_fields (list[str]): fields a partial offer must have,
+                                         `SEARCH_REQUIRED_FIELDS` by default
 
-            search_response = self._request_http_get(search_url,
-                                                     headers=random_headers,
-                                                     params=search_params)
+        Returns:
+            (list[OtodomOffer]): partial offers from all N pages
+            (list[str]): urls of offers to scrape in full
+            (list[int]): number of urls aquired from subsequent pages
+        """
+        required_fields = required_fields or self.SEARCH_REQUIRED_FIELDS
+        pages = self._search_pages(
+            functools.partial(self._get_offers_items_from_search_page, search_params),
+            n_pages, window,
+            page_size=int(search_params.get("limit", 0)))
 
-            self._log.debug(f"Requested search url: {search_response.url} ")
+        offers_items = {}
+        for page_items_list in pages:
+            for offer_item in page_items_list:
+                if offer_item.get("slug"):
+                    offers_items.setdefault(self._get_offer_url(offer_item), offer_item)
 
-            search_soup = self._make_soup(search_response)
+        offers = []
+        urls_to_scrape = []
+        for url, offer_item in offers_items.items():
             try:
-                page_urls_list = self._get_offers_urls_from_single_search_page(
-                    search_soup)
-                n_of_urls_from_pages.append(len(page_urls_list))
+                offer = self._parse_search_item(offer_item)
             except Exception as e:
-                self._log.exception(e)
-                page_urls_list = []
-
-            self._log.debug(f"Got {len(page_urls_list)} urls from search page")
-
-            all_urls_list.extend(page_urls_list)
+                self._log.warning(f"Parsing search item of {url} failed: {e}")
+                urls_to_scrape.append(url)
+                continue
 
-            if not page_urls_list:
-                self._log.warning("No urls found on a search page. "
-                                  "Searching aborted")
-                break
+            if any(getattr(offer, field) is None for field in required_fields):
+                urls_to_scrape.append(url)
+            else:
+                offers.append(offer)
 
-        self._log.info(f"Found {len(all_urls_list)} urls from search params. "
-                       f"{len(list(set(all_urls_list)))} are unique")
-        return list(set(all_urls_list)), n_of_urls_from_pages
+        self._log.info(f"Harvested {len(offers)} offers from search results, "
+                       f"{len(urls_to_scrape)} offers left to scrape")
+        return offers, urls_to_scrape, [len(self._get_offers_urls(page_items_list))
+                                        for page_items_list in pages]
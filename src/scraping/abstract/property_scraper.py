@@ -1,14 +1,26 @@
+import time
 import toml
+import asyncio
 import logging
+import httpx
 import requests
 from bs4 import BeautifulSoup
 from abc import ABC, abstractmethod
 from datetime import datetime
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from utils.scraping import generate_random_headers
+from utils.http import get_async_client
+from metrics import stage_timer
+from data.models.common import Offer
+from scraping.rate_control import (AdaptiveRateController, backoff_delay, is_retryable,
+                                   get_rate_controller)
+from scraping.sessions import SessionPool, get_session_pool
 
 
 toml_config = toml.load("../src/conf/config.toml")
+scraping_config = toml_config["scraping"]
 
 
 class PropertyScraper(ABC):
@@ -37,30 +49,185 @@ class PropertyScraper(ABC):
         """
         return generate_random_headers()
 
+    @property
+    def rate_controller(self) -> AdaptiveRateController:
+        return get_rate_controller(self.SERVICE_NAME)
+
+    @property
+    def session_pool(self) -> SessionPool:
+        return get_session_pool(self.SERVICE_NAME)
+
     def _request_http_get(self,
                           url: str,
                           headers: dict = None,
-                          params: dict = None) -> requests.Response:
+                          params: dict = None,
+                          windowed: bool = False) -> requests.Response:
         """
         Sends a get request under the given URL with headers (if exist)
         and params (if exist). Returns the response.
+
+        Requests go through the keep-alive session pool of the service and
+        send the header identity of the session unless `headers` are given.
+        They are paced by the rate controller of the service, search pages
+        requested in a window (`windowed`) by its search windows budget. Failed,
+        throttled and 5xx requests are retried with jittered exponential
+        backoff, the last response is returned if all attempts fail.
+        """
+        controller = self.rate_controller
+        for attempt in range(scraping_config["max_retries"] + 1):
+            controller.acquire(windowed)
+            start = time.monotonic()
+            try:
+                response = self.session_pool.get(url,
+                                                 headers=headers,
+                                                 params=params)
+            except Exception as e:
+                controller.on_error()
+                self._log.error(f"Requesting {url} failed")
+                self._log.exception(e)
+                response = requests.Response()
+            else:
+                controller.on_response(response.status_code, time.monotonic() - start)
+                if not response.ok:
+                    self._log.warning(f"Response code {response.status_code} when"
+                                      f" requesting {url}")
+
+            if not is_retryable(response.status_code) or attempt == scraping_config["max_retries"]:
+                return response
+
+            delay = backoff_delay(attempt, scraping_config["backoff_base"],
+                                  scraping_config["backoff_max"],
+                                  response.headers.get("Retry-After"))
+            self._log.info(f"Retrying {url} in {delay:.1f} s")
+            controller.on_retry()
+            time.sleep(delay)
+
+    async def _request_http_get_async(self,
+                                      url: str,
+                                      headers: dict = None,
+                                      params: dict = None) -> httpx.Response:
+        """
+        Async equivalent of `_request_http_get` using the shared pooled
+        client. Unlike the sync version it raises if the request fails.
         """
         try:
-            response = requests.get(url,
-                                    headers=headers,
-                                    params=params)
+            response = await get_async_client().get(url,
+                                                    headers=headers,
+                                                    params=params)
         except Exception as e:
             self._log.error(f"Requesting {url} failed")
             self._log.exception(e)
-            return requests.Response()
+            raise
 
-        if not response.ok:
+        if not response.is_success:
             self._log.warning(f"Response code {response.status_code} when"
                               f" requesting {url}")
 
         return response
 
-    def _make_soup(self, http_response: requests.Response) -> BeautifulSoup:
+    async def scrape_offer_from_url_async(self, url: str) -> Offer:
+        """
+        Async equivalent of `scrape_offer_from_url`. The page is fetched with
+        the shared pooled client and parsed in a worker thread.
+        """
+        with stage_timer("fetch"):
+            response = await self._request_http_get_async(
+                url, headers=self._generate_headers())
+        with stage_timer("parse"):
+            offer_soup = await asyncio.to_thread(self._make_soup, response)
+            return await asyncio.to_thread(self._parse_offer_soup, offer_soup)
+
+    def _search_pages(self,
+                      get_page_results: Callable[[int, bool], list],
+                      n_pages: int,
+                      window: int = 1,
+                      page_size: int = 0) -> list[list]:
+        """
+        Requests subsequent search pages until `n_pages` or the last page.
+        Page by page, requests are paced by the rate controller of the
+        service only, in windows by its search windows budget.
+
+        Args:
+            get_page_results (Callable): returns results (e.g. urls) found
+                                         on a page number, takes whether
+                                         the page is requested in a window
+            n_pages (int): max. number of pages to search
+            window (int): number of pages requested concurrently
+            page_size (int): number of results on a full page, 0 if unknown
+
+        Returns:
+            (list[list]): results of subsequent pages
+        """
+        if window > 1:
+            return self._search_pages_concurrently(get_page_results, n_pages,
+                                                   window, page_size)
+
+        pages = []
+        self._log.debug(f"About to scrape {n_pages} pages")
+        for page_number in range(1, n_pages + 1):
+            pages.append(get_page_results(page_number, False))
+
+            if not pages[-1]:
+                self._log.warning("No urls found on a search page. "
+                                  "Searching aborted")
+                break
+
+        return pages
+
+    def _search_pages_concurrently(self,
+                                   get_page_results: Callable[[int], list],
+                                   n_pages: int,
+                                   window: int,
+                                   page_size: int = 0) -> list[list]:
+        """
+        Requests search pages in a sliding window of concurrent pages. An empty
+        page, or one with fewer results than a full page, is the last one:
+        pages after it which are not requested yet are cancelled and results
+        of those in flight are dropped, so the result is the same as when
+        searching page by page.
+        """
+        pages = {}
+        last_page = n_pages
+        next_page = 1
+        in_flight = {}
+        self._log.debug(f"About to scrape up to {n_pages} pages, {window} at a time")
+
+        executor = ThreadPoolExecutor(window)
+        try:
+            while in_flight or next_page <= last_page:
+                while next_page <= last_page and len(in_flight) < window:
+                    in_flight[executor.submit(get_page_results, next_page, True)] = next_page
+                    next_page += 1
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page_number = in_flight.pop(future)
+                    pages[page_number] = future.result()
+                    if len(pages[page_number]) < max(page_size, 1):
+                        last_page = min(last_page, page_number)
+
+                for future, page_number in list(in_flight.items()):
+                    if page_number > last_page:
+                        future.cancel()
+                        del in_flight[future]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if last_page < n_pages:
+            self._log.info(f"Page {last_page} is the last search page. Searching ended")
+
+        return [pages[page_number] for page_number in range(1, last_page + 1)]
+
+    def _get_unique_urls(self, urls: list[str]) -> list[str]:
+        """
+        Drops duplicated urls, keeping the first occurrence of each
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        self._log.info(f"Found {len(urls)} urls from search params. "
+                       f"{len(unique_urls)} are unique")
+        return unique_urls
+
+    def _make_soup(self, http_response: requests.Response | httpx.Response) -> BeautifulSoup:
         try:
             return BeautifulSoup(http_response.text, 'html.parser')
         except Exception as e:
@@ -69,6 +69,14 @@ class SearchEmailSender(EmailSender):
         content += f"End: {end_str}\n"
         content += f"Acquired: {report.total_n_of_urls_acquired}" \
                    f" ({report.n_of_urls_acquired_from_pages})\n"
+        if report.n_of_offers_harvested:
+            content += (f"Harvested: {report.n_of_offers_harvested}"
+                        f" (backfilled: {report.n_of_offers_backfilled},"
+                        f" left to scrape: {report.n_of_urls_to_scrape},"
+                        f" already in database: {report.n_of_offers_scraped_before})\n")
+            content += f"Postgresql success: {report.n_postgresql_success}\n"
+            content += f"Mongodb success: {report.n_mongo_success}\n"
+        content += f"Rate control: {report.rate_control}\n"
 
         return content
 
@@ -98,5 +106,6 @@ class ScrapeEmailSender(EmailSender):
                     f" ({report.n_of_offers_in_packages_success})\n")
         content += f"Postgresql success: {report.n_postgresql_success}\n"
         content += f"Mongodb success: {report.n_mongo_success}\n"
+        content += f"Rate control: {report.rate_control}\n"
 
         return content
@@ -1,7 +1,9 @@
 import re
 import json
 import fire
+import toml
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -16,6 +18,7 @@ from scraping.orchestration.reports import (ScrapingReport,
                                             OffersScrapingReport)
 from scraping.logger import setup_logger
 from scraping.otodom import OtodomSearchParams
+from scraping.abstract.otodom_scraper import OtodomScraper
 from scraping.orchestration import (OtodomFiltersPath,
                                     DomiportaFiltersPath,
                                     OtodomSearchParamsSet,
@@ -25,7 +28,10 @@ from scraping.orchestration import (OtodomFiltersPath,
                                     JobTypes)
 from scraping.orchestration.messaging import (SearchEmailSender,
                                               ScrapeEmailSender)
-from exceptions import ServiceNotExists
+from exceptions import ServiceNotExists, ServiceBlocked
+
+
+scraping_config = toml.load("../src/conf/config.toml")["scraping"]
 
 
 class ScrapingOrchestrator:
@@ -120,9 +126,11 @@ class ScrapingOrchestrator:
         return search_params_dict, custom_search_params["n_pages"]
 
     def search_offers_urls(self, cache: bool = True,
-                           avg_sleep_time: int = 2) -> list[str]:
+                           window: int = None) -> list[str]:
         """
-        Searches for offers urls based on search params and saves urls to Redis
+        Searches for offers urls based on search params and saves urls to Redis.
+        Search pages are requested `window` at a time, by default as set in
+        the scraping config, or one by one if it is 1.
         """
         self._log.info("Searching offers urls started")
 
@@ -133,25 +141,119 @@ class ScrapingOrchestrator:
             default_search_params, custom_search_params)
 
         offers_urls, n_of_urls_from_pages = self.scraper.list_offers_urls_from_search_params(
-            all_search_params, n_pages_to_scrape, avg_sleep_time)
+            all_search_params, n_pages_to_scrape,
+            window=window or scraping_config["search_window"])
         self.report.n_of_urls_acquired_from_pages = n_of_urls_from_pages
+        self.report.rate_control = self.scraper.rate_controller.status()
 
         if cache:
-            self._log.debug("Caching offers urls started")
-            cache_key_name = f"{self.scraper.name}_{len(offers_urls)}"
-            self.storage_manager.cache_data(cache_key_name, offers_urls)
-            self._log.debug("Caching offers urls ended")
+            self._cache_offers_urls(offers_urls)
 
         return offers_urls
 
+    def harvest_offers(self, cache: bool = True,
+                       avg_sleep_time: int = 2,
+                       window: int = None,
+                       n_workers: int = 1) -> list[OtodomOffer]:
+        """
+        Builds offers straight from search results. Pages are requested only
+        for offers missing features of the price models in the results, to
+        fill them in. Urls of offers which miss required fields in the
+        results, or whose pages fail, are saved to Redis to be scraped in
+        full by the scrape job. Offers already in the database are skipped.
+        Supported for Otodom only.
+        """
+        if not isinstance(self.scraper, OtodomScraper):
+            raise ValueError(f"Harvesting offers from search results "
+                             f"is not supported for {self.service_name}")
+
+        self._log.info(f"Harvesting offers from search results started | workers: {n_workers}")
+
+        default_search_params = self._get_default_search_params()
+        custom_search_params = self._get_custom_search_params()
+
+        all_search_params, n_pages_to_scrape = self._combine_search_params(
+            default_search_params, custom_search_params)
+
+        offers, urls_to_scrape, n_of_urls_from_pages = (
+            self.scraper.harvest_offers_from_search_params(
+                all_search_params, n_pages_to_scrape,
+                window=window or scraping_config["search_window"]))
+        self.report.n_of_urls_acquired_from_pages = n_of_urls_from_pages
+
+        urls_in_db = self.storage_manager.get_from_postgresql(("url",)).values
+        new_offers = []
+        for offer in offers:
+            if offer.url in urls_in_db:
+                self._log.warning(f"URL {offer.url} already in database")
+                self.report.n_of_offers_scraped_before += 1
+                continue
+            new_offers.append(offer)
+
+        offers_to_backfill = {offer.url: offer for offer in new_offers
+                              if self.scraper.get_missing_fields(offer)}
+        self._log.info(f"{len(offers_to_backfill)} harvested offers to backfill")
+
+        executor = ThreadPoolExecutor(n_workers) if n_workers > 1 else None
+        backfilled_urls = set()
+        try:
+            for url, result in self._scrape_urls(list(offers_to_backfill), avg_sleep_time,
+                                                 executor, offers_to_backfill):
+                if isinstance(result, Exception):
+                    self._log.warning(f"Offer backfilling failed ({url})")
+                    self._log.warning(f"Error: {str(type(result))}: {str(result)}")
+                else:
+                    backfilled_urls.add(url)
+        except ServiceBlocked as e:
+            self._log.error(f"Backfilling aborted, offers left to scrape: {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        # Offers which could not be backfilled are scraped in full instead
+        not_backfilled_urls = [url for url in offers_to_backfill if url not in backfilled_urls]
+        offers = [offer for offer in new_offers
+                  if offer.url not in offers_to_backfill or offer.url in backfilled_urls]
+        urls_to_scrape += not_backfilled_urls
+        self.report.n_of_offers_backfilled = len(backfilled_urls)
+
+        self.report.n_of_offers_harvested = len(offers)
+        self.report.n_of_urls_to_scrape = len(urls_to_scrape)
+        self.report.rate_control = self.scraper.rate_controller.status()
+
+        if cache and urls_to_scrape:
+            self._cache_offers_urls(urls_to_scrape)
+
+        return offers
+
+    def _cache_offers_urls(self, offers_urls: list[str]):
+        self._log.debug("Caching offers urls started")
+        cache_key_name = f"{self.scraper.name}_{len(offers_urls)}"
+        self.storage_manager.cache_data(cache_key_name, offers_urls)
+        self._log.debug("Caching offers urls ended")
+
     def scrape_cached_urls(self,
                            cache_pattern: str,
                            clear_cache: bool = True,
-                           avg_sleep_time: int = 2):
+                           avg_sleep_time: int = 2,
+                           n_workers: int = 1):
         """
         Reads cached URLs based on a given pattern and scrapes them
+
+        Args:
+            cache_pattern (str): regex matching the cache keys to scrape
+            clear_cache (bool): whether to clear the scraped cache keys
+            avg_sleep_time (int): avg. n. of secs. to sleep between requests
+                                  when scraping serially
+            n_workers (int): number of offers scraped concurrently. With more
+                             than one worker the random sleeps are dropped and
+                             only the rate controller of the service paces
+                             the requests.
+
+        Scraping stops early if the service keeps blocking requests,
+        the package being scraped is then left in the cache.
         """
-        self._log.info("Scraping cached offers started")
+        self._log.info(f"Scraping cached offers started | workers: {n_workers}")
 
         all_keys = self.storage_manager.redis_db.scan_iter()
         matching_keys = [key
@@ -160,56 +262,113 @@ class ScrapingOrchestrator:
 
         self._log.debug(f"Cached files read: {matching_keys}")
 
+        executor = ThreadPoolExecutor(n_workers) if n_workers > 1 else None
+
         all_offers_scraped = []
         n_of_offers_to_scrape = 0
-        for key in matching_keys:
-            urls_in_db = self.storage_manager.get_from_postgresql(
-                ("url",)).values
-
-            urls_package = self.storage_manager.read_cache(key, from_json=True)
-            n_of_offers_to_scrape += len(urls_package)
-            self._log.debug(f"Scraping offers from {key},"
-                            f" {len(urls_package)} offers to scrape")
-
-            n_urls_from_package_scraped = 0
-            self.report.n_of_offers_in_packages_attempted.append(0)
-
-            stop_limit = None if self.mode == ScrapingModes.PROD.value else 8
-            for url in urls_package[:stop_limit]:
-                self.report.n_of_offers_in_packages_attempted[-1] += 1
-                if url in urls_in_db:
-                    self._log.warning(f"URL {url} already in database")
-                    self.report.n_of_offers_scraped_before += 1
-                    continue
-
-                random_sleep(avg_sleep_time)
-
+        try:
+            for key in matching_keys:
+                urls_in_db = self.storage_manager.get_from_postgresql(
+                    ("url",)).values
+
+                urls_package = self.storage_manager.read_cache(key, from_json=True)
+                n_of_offers_to_scrape += len(urls_package)
+                self._log.debug(f"Scraping offers from {key},"
+                                f" {len(urls_package)} offers to scrape")
+
+                n_urls_from_package_scraped = 0
+                self.report.n_of_offers_in_packages_attempted.append(0)
+
+                stop_limit = None if self.mode == ScrapingModes.PROD.value else 8
+                urls_to_scrape = []
+                for url in urls_package[:stop_limit]:
+                    self.report.n_of_offers_in_packages_attempted[-1] += 1
+                    if url in urls_in_db:
+                        self._log.warning(f"URL {url} already in database")
+                        self.report.n_of_offers_scraped_before += 1
+                        continue
+                    urls_to_scrape.append(url)
+
+                # Results are counted here, in the calling thread, so
+                # the report is never updated by workers concurrently
+                blocked = None
                 try:
-                    offer_data_model = self.scraper.scrape_offer_from_url(url)
-                    all_offers_scraped.append(offer_data_model)
-                    n_urls_from_package_scraped += 1
-                    self._log.info(f"Offer successfully scraped from {url}")
-                except Exception as e:
-                    self.report.n_of_unknown_errors += 1
-                    self._log.warning(f"Offer scraping failed ({url})")
-                    self._log.warning(f"Error: {str(type(e))}: {str(e)}")
-
-            self.report.n_of_offers_in_packages_success.append(
-                n_urls_from_package_scraped)
-
-            self._log.debug(f"For {key}: {n_urls_from_package_scraped} offers"
-                            f" scraped out of {len(urls_package)} "
-                            f"({calc_perc(n_urls_from_package_scraped, len(urls_package))}%)")
-
-            if clear_cache:
-                self.storage_manager.clear_cache(key)
-                self._log.debug(f"{key}: cache cleared after scraping")
+                    for url, result in self._scrape_urls(urls_to_scrape, avg_sleep_time,
+                                                         executor):
+                        if isinstance(result, Exception):
+                            self.report.n_of_unknown_errors += 1
+                            self._log.warning(f"Offer scraping failed ({url})")
+                            self._log.warning(f"Error: {str(type(result))}: {str(result)}")
+                        else:
+                            all_offers_scraped.append(result)
+                            n_urls_from_package_scraped += 1
+                            self._log.info(f"Offer successfully scraped from {url}")
+                except ServiceBlocked as e:
+                    blocked = e
+
+                self.report.n_of_offers_in_packages_success.append(
+                    n_urls_from_package_scraped)
+
+                if blocked is not None:
+                    self._log.error(f"Scraping aborted, {key} left in cache: {blocked}")
+                    break
+
+                self._log.debug(f"For {key}: {n_urls_from_package_scraped} offers"
+                                f" scraped out of {len(urls_package)} "
+                                f"({calc_perc(n_urls_from_package_scraped, len(urls_package))}%)")
+
+                if clear_cache:
+                    self.storage_manager.clear_cache(key)
+                    self._log.debug(f"{key}: cache cleared after scraping")
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            self.report.rate_control = self.scraper.rate_controller.status()
 
         self._log.info(f"Altogether {len(all_offers_scraped)} offers scraped"
                        f" out of {n_of_offers_to_scrape} "
                        f"({calc_perc(len(all_offers_scraped), n_of_offers_to_scrape)}%)")
         return all_offers_scraped
 
+    def _scrape_urls(self, urls: list[str], avg_sleep_time: int,
+                     executor: ThreadPoolExecutor | None,
+                     harvested_offers: dict[str, OtodomOffer] = None):
+        """
+        Scrapes offers one by one with random sleeps in between or, given
+        an executor, concurrently. Urls of `harvested_offers` are scraped to
+        backfill those offers.
+
+        Yields:
+            (str, OtodomOffer | Exception): URL and its offer or the error,
+                                            in the order of `urls`
+        """
+        harvested_offers = harvested_offers or {}
+        if executor is None:
+            for url in urls:
+                random_sleep(avg_sleep_time)
+                yield url, self._scrape_offer(url, harvested_offers.get(url))
+            return
+
+        futures = [executor.submit(self._scrape_offer, url, harvested_offers.get(url))
+                   for url in urls]
+        try:
+            for url, future in zip(urls, futures):
+                yield url, future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _scrape_offer(self, url: str,
+                      harvested_offer: OtodomOffer = None) -> OtodomOffer | Exception:
+        try:
+            if harvested_offer is not None:
+                return self.scraper.backfill_offer(harvested_offer)
+            return self.scraper.scrape_offer_from_url(url)
+        except ServiceBlocked:
+            raise
+        except Exception as e:
+            return e
+
     def store_scraped_offers(self, offers: list[OtodomOffer],
                              postgresql: bool = False,
                              mongodb: bool = False,
@@ -250,7 +409,8 @@ class ScrapingOrchestrator:
 
 class Pipeline:
     @staticmethod
-    def search(service_name: str, property_type: str, mode: int):
+    def search(service_name: str, property_type: str, mode: int,
+               harvest: bool = False, n_workers: int = None):
         job_type = JobTypes.SEARCH.value
         scraper_name = generate_scraper_name(service_name, property_type,
                                              job_type)
@@ -261,7 +421,14 @@ class Pipeline:
                                             job_type,
                                             mode)
 
-        orchestrator.search_offers_urls()
+        if harvest:
+            offers = orchestrator.harvest_offers(
+                n_workers=n_workers or scraping_config["n_workers"])
+            logger.info(f"{len(offers)} offers harvested from search results")
+            orchestrator.store_scraped_offers(offers,
+                                              postgresql=True, mongodb=True)
+        else:
+            orchestrator.search_offers_urls()
         orchestrator.report.scraping_ended = datetime.now()
 
         # sender = SearchEmailSender(service_name, property_type)
@@ -272,7 +439,7 @@ class Pipeline:
 
     @staticmethod
     def scrape(service_name: str, property_type: str, mode: int,
-               clear_cache: bool = True):
+               clear_cache: bool = True, n_workers: int = None):
         job_type = JobTypes.SCRAPE.value
         scraper_name = generate_scraper_name(service_name, property_type,
                                              job_type)
@@ -283,9 +450,11 @@ class Pipeline:
                                             job_type,
                                             mode)
         pattern = rf".*{service_name.upper()}_{property_type.upper()}_SEARCH.*"
-        offers = orchestrator.scrape_cached_urls(pattern,
-                                                 clear_cache=clear_cache,
-                                                 avg_sleep_time=5)
+        offers = orchestrator.scrape_cached_urls(
+            pattern,
+            clear_cache=clear_cache,
+            avg_sleep_time=5,
+            n_workers=n_workers or scraping_config["n_workers"])
         orchestrator.report.scraping_ended = datetime.now()
 
         logger.info(f"{len(offers)} cached offers scraped")
@@ -2,12 +2,19 @@ class ScrapingReport:
     def __init__(self):
         self.scraping_started = None
         self.scraping_ended = None
+        self.rate_control = None
 
 
 class SearchScrapingReport(ScrapingReport):
     def __init__(self):
         super().__init__()
         self.n_of_urls_acquired_from_pages = []
+        self.n_of_offers_harvested = 0
+        self.n_of_offers_backfilled = 0
+        self.n_of_offers_scraped_before = 0
+        self.n_of_urls_to_scrape = 0
+        self.n_postgresql_success = 0
+        self.n_mongo_success = 0
 
     @property
     def total_n_of_urls_acquired(self):
@@ -12,6 +12,9 @@ from utils.general import smart_join, smart_cast, smart_slice
 class OtodomApartmentScraper(OtodomScraper):
     PROPERTY_TYPE: str = PropertyTypes.HOUSES.value
     SUB_URL: str = "pl/oferty/sprzedaz/mieszkanie/cala-polska"
+    SEARCH_REQUIRED_FIELDS: list[str] = OtodomScraper.SEARCH_REQUIRED_FIELDS + [
+        "apartment_area", "n_rooms"]
+    BACKFILL_FIELDS: list[str] = OtodomScraper.BACKFILL_FIELDS + ["market", "build_year"]
 
     def __init__(self, scraper_name: str):
         super().__init__(scraper_name)
@@ -116,3 +119,18 @@ class OtodomApartmentScraper(OtodomScraper):
 
         offer_model.put_none_to_empty_values()
         return offer_model
+
+    def _parse_search_item(self, offer_item: dict) -> OtodomApartmentOffer:
+        """
+        Creates a partial OtodomApartmentOffer instance from raw data of an offer
+        found in search results
+        """
+        offer_model = OtodomApartmentOffer(
+            **self._get_search_item_fields(offer_item),
+            market=self._get_search_item_market(offer_item),
+            apartment_area=smart_cast(offer_item.get("areaInSquareMeters"), int),
+            n_rooms=self._convert_rooms_number(offer_item.get("roomsNumber")),
+        )
+
+        offer_model.put_none_to_empty_values()
+        return offer_model
@@ -13,6 +13,9 @@ from utils.general import smart_join, smart_slice, smart_cast
 class OtodomHouseScraper(OtodomScraper):
     PROPERTY_TYPE: str = PropertyTypes.HOUSES.value
     SUB_URL: str = "pl/oferty/sprzedaz/dom/cala-polska"
+    SEARCH_REQUIRED_FIELDS: list[str] = OtodomScraper.SEARCH_REQUIRED_FIELDS + [
+        "lot_area", "house_area", "n_rooms"]
+    BACKFILL_FIELDS: list[str] = OtodomScraper.BACKFILL_FIELDS + ["location", "market", "build_year"]
 
     def __init__(self, scraper_name: str):
         super().__init__(scraper_name)
@@ -125,3 +128,19 @@ class OtodomHouseScraper(OtodomScraper):
 
         offer_model.put_none_to_empty_values()
         return offer_model
+
+    def _parse_search_item(self, offer_item: dict) -> OtodomHouseOffer:
+        """
+        Creates a partial OtodomHouseOffer instance from raw data of an offer
+        found in search results
+        """
+        offer_model = OtodomHouseOffer(
+            **self._get_search_item_fields(offer_item),
+            market=self._get_search_item_market(offer_item),
+            house_area=smart_cast(offer_item.get("areaInSquareMeters"), int),
+            lot_area=smart_cast(offer_item.get("terrainAreaInSquareMeters"), int),
+            n_rooms=self._convert_rooms_number(offer_item.get("roomsNumber")),
+        )
+
+        offer_model.put_none_to_empty_values()
+        return offer_model
@@ -7,12 +7,15 @@ from scraping.abstract.otodom_scraper import OtodomScraper
 from data.models.otodom import OtodomLandOffer
 from scraping import PropertyTypes
 from exceptions import InvalidOffer
-from utils.general import smart_join
+from utils.general import smart_join, smart_cast
 
 
 class OtodomLandScraper(OtodomScraper):
     PROPERTY_TYPE: str = PropertyTypes.LANDS.value
     SUB_URL: str = "pl/oferty/sprzedaz/dzialka/cala-polska"
+    SEARCH_REQUIRED_FIELDS: list[str] = OtodomScraper.SEARCH_REQUIRED_FIELDS + [
+        "land_area"]
+    BACKFILL_FIELDS: list[str] = OtodomScraper.BACKFILL_FIELDS + ["location"]
 
     def __init__(self, scraper_name: str):
         super().__init__(scraper_name)
@@ -91,3 +94,16 @@ class OtodomLandScraper(OtodomScraper):
 
         offer_model.put_none_to_empty_values()
         return offer_model
+
+    def _parse_search_item(self, offer_item: dict) -> OtodomLandOffer:
+        """
+        Creates a partial OtodomLandOffer instance from raw data of an offer
+        found in search results
+        """
+        offer_model = OtodomLandOffer(
+            **self._get_search_item_fields(offer_item),
+            land_area=smart_cast(offer_item.get("areaInSquareMeters"), int),
+        )
+
+        offer_model.put_none_to_empty_values()
+        return offer_model
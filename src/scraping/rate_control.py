@@ -0,0 +1,256 @@
+import time
+import random
+import logging
+import threading
+
+import toml
+
+from utils.http import TokenBucket
+from exceptions import ServiceBlocked
+
+
+rate_control_config = toml.load("../src/conf/config.toml")["scraping"]["rate_control"]
+
+_log = logging.getLogger(__name__)
+
+BLOCKING_STATUS_CODES = (403, 429)
+
+
+def is_retryable(status_code: int | None) -> bool:
+    """
+    Whether a request is worth repeating: it failed without a response,
+    was throttled or hit a server error
+    """
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+def backoff_delay(attempt: int, base: float, cap: float,
+                  retry_after: str | None = None) -> float:
+    """
+    Exponential backoff with full jitter: a random delay between 0 and
+    `base * 2 ** attempt`, capped at `cap` and never shorter than
+    the `Retry-After` header sent by the server
+
+    Args:
+        attempt (int): number of the failed attempt, starting from 0
+        base (float): max. delay after the first attempt, in seconds
+        cap (float): max. delay, in seconds
+        retry_after (str): value of the `Retry-After` header, if any
+
+    Returns:
+        (float): number of seconds to wait before the next attempt
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    try:
+        return max(delay, min(cap, float(retry_after)))
+    except (TypeError, ValueError):
+        return delay
+
+
+class AdaptiveRateController:
+    def __init__(self,
+                 name: str,
+                 initial_rate: float,
+                 min_rate: float,
+                 max_rate: float,
+                 burst: float,
+                 window_rate: float,
+                 window_burst: float,
+                 increase: float,
+                 decrease_factor: float,
+                 decrease_cooldown: float,
+                 latency_spike_factor: float,
+                 breaker_threshold: int,
+                 breaker_pause: float,
+                 breaker_max_trips: int):
+        """
+        AIMD controller of the request rate to a service. Every healthy
+        response raises the rate by `increase` requests per second, while
+        throttling (429), blocking (403), server errors and latency spikes
+        multiply it by `decrease_factor`, at most once per cooldown, so
+        a burst of failing in-flight requests counts as one signal.
+
+        Search pages requested in concurrent windows take tokens of a budget
+        of their own, which allows a whole window at once. It is decreased
+        along with the main rate and recovers up to `window_rate`.
+
+        A circuit breaker opens after `breaker_threshold` blocking responses
+        in a row and pauses all requests for `breaker_pause` seconds. If it
+        trips more than `breaker_max_trips` times without a successful
+        response in between, acquiring raises ServiceBlocked.
+
+        Args:
+            name (str): name of the service, used in logs
+            initial_rate (float): requests per second to start with
+            min_rate (float): lower bound of the rate
+            max_rate (float): upper bound of the rate
+            burst (float): number of requests which can be sent at once
+            window_rate (float): max. requests per second of search windows
+            window_burst (float): number of search pages which can be
+                                  requested at once, i.e. the window size
+            increase (float): rate added after each healthy response
+            decrease_factor (float): rate multiplier after a failure
+            decrease_cooldown (float): min. number of seconds between decreases
+            latency_spike_factor (float): a response slower than this many
+                                          times the average latency is a spike
+            breaker_threshold (int): blocking responses in a row opening the breaker
+            breaker_pause (float): number of seconds the breaker stays open
+            breaker_max_trips (int): trips without a success before giving up
+        """
+        self.name = name
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.latency_spike_factor = latency_spike_factor
+        self.breaker_threshold = breaker_threshold
+        self.breaker_pause = breaker_pause
+        self.breaker_max_trips = breaker_max_trips
+
+        self.window_rate = window_rate
+        self.bucket = TokenBucket(initial_rate, burst)
+        self.window_bucket = TokenBucket(window_rate, window_burst)
+        self._lock = threading.Lock()
+        self._last_decrease_at = float("-inf")
+        self._avg_latency = None
+        self._n_blocked_in_row = 0
+        self._n_trips_in_row = 0
+        self._open_until = 0.0
+
+        self.n_requests = 0
+        self.n_healthy = 0
+        self.n_throttled = 0
+        self.n_forbidden = 0
+        self.n_server_errors = 0
+        self.n_request_errors = 0
+        self.n_latency_spikes = 0
+        self.n_retries = 0
+        self.n_decreases = 0
+        self.n_breaker_trips = 0
+        self.min_rate_reached = initial_rate
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def acquire(self, windowed: bool = False):
+        """
+        Waits until a request can be sent: for the circuit breaker to close
+        and for a token of the current rate, or of the search windows budget
+        if `windowed`
+
+        Raises:
+            ServiceBlocked: if the service keeps blocking requests
+        """
+        with self._lock:
+            if self._n_trips_in_row > self.breaker_max_trips:
+                raise ServiceBlocked(f"{self.name} blocked requests after "
+                                     f"{self._n_trips_in_row} circuit breaker pauses")
+            pause = self._open_until - time.monotonic()
+
+        if pause > 0:
+            time.sleep(pause)
+        (self.window_bucket if windowed else self.bucket).acquire()
+
+    def on_response(self, status_code: int, latency: float):
+        with self._lock:
+            self.n_requests += 1
+            if status_code in BLOCKING_STATUS_CODES:
+                if status_code == 429:
+                    self.n_throttled += 1
+                else:
+                    self.n_forbidden += 1
+                self._n_blocked_in_row += 1
+                if self._n_blocked_in_row >= self.breaker_threshold:
+                    self._trip_breaker()
+                self._decrease()
+                return
+
+            self._n_blocked_in_row = 0
+            self._n_trips_in_row = 0
+            is_spike = (self._avg_latency is not None
+                        and latency > self.latency_spike_factor * self._avg_latency)
+            self._avg_latency = (latency if self._avg_latency is None
+                                 else 0.9 * self._avg_latency + 0.1 * latency)
+
+            if status_code >= 500:
+                self.n_server_errors += 1
+                self._decrease()
+            elif is_spike:
+                self.n_latency_spikes += 1
+                self._decrease()
+            else:
+                self.n_healthy += 1
+                self.bucket.set_rate(min(self.max_rate, self.rate + self.increase))
+                self.window_bucket.set_rate(min(self.window_rate,
+                                                self.window_bucket.rate + self.increase))
+
+    def on_error(self):
+        """
+        Registers a request which failed without a response
+        """
+        with self._lock:
+            self.n_requests += 1
+            self.n_request_errors += 1
+            self._decrease()
+
+    def on_retry(self):
+        with self._lock:
+            self.n_retries += 1
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease_at < self.decrease_cooldown or self.rate <= self.min_rate:
+            return
+        self._last_decrease_at = now
+        self.n_decreases += 1
+        self.bucket.set_rate(max(self.min_rate, self.rate * self.decrease_factor))
+        self.window_bucket.set_rate(max(self.min_rate,
+                                        self.window_bucket.rate * self.decrease_factor))
+        self.min_rate_reached = min(self.min_rate_reached, self.rate)
+        _log.warning(f"{self.name} request rate decreased to {self.rate:.3f}/s")
+
+    def _trip_breaker(self):
+        self._n_blocked_in_row = 0
+        self._n_trips_in_row += 1
+        self.n_breaker_trips += 1
+        self._open_until = time.monotonic() + self.breaker_pause
+        _log.error(f"{self.name} is blocking requests, pausing for {self.breaker_pause} s")
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 4),
+                "window_rate": round(self.window_bucket.rate, 4),
+                "min_rate_reached": round(self.min_rate_reached, 4),
+                "avg_latency": round(self._avg_latency, 4) if self._avg_latency else None,
+                "breaker_open": self._open_until > time.monotonic(),
+                "blocked": self._n_trips_in_row > self.breaker_max_trips,
+                "requests": self.n_requests,
+                "healthy": self.n_healthy,
+                "throttled": self.n_throttled,
+                "forbidden": self.n_forbidden,
+                "server_errors": self.n_server_errors,
+                "request_errors": self.n_request_errors,
+                "latency_spikes": self.n_latency_spikes,
+                "retries": self.n_retries,
+                "decreases": self.n_decreases,
+                "breaker_trips": self.n_breaker_trips,
+            }
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_rate_controller(service_name: str) -> AdaptiveRateController:
+    """
+    Returns the rate controller of a service, shared by all its scrapers
+    in the process
+    """
+    with _controllers_lock:
+        if service_name not in _controllers:
+            _controllers[service_name] = AdaptiveRateController(service_name,
+                                                                **rate_control_config)
+        return _controllers[service_name]
@@ -0,0 +1,88 @@
+import queue
+import threading
+import contextlib
+
+import toml
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+
+from utils.scraping import generate_random_headers
+
+
+sessions_config = toml.load("../src/conf/config.toml")["scraping"]["sessions"]
+
+
+class SessionPool:
+    def __init__(self, n_sessions: int, pool_maxsize: int, timeout: float):
+        """
+        Pool of `requests` sessions kept alive between requests, so batch
+        jobs reuse TCP and TLS connections instead of opening one per page.
+        Each session has its own header identity, drawn once from the
+        headers config, and is used by one thread at a time.
+
+        Args:
+            n_sessions (int): number of sessions, i.e. max. concurrent requests
+            pool_maxsize (int): max. number of connections kept per host
+                                in a session
+            timeout (float): number of seconds to wait for a response
+        """
+        self.n_sessions = n_sessions
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(n_sessions)
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(generate_random_headers())
+        # Only encodings urllib3 can decode, "br" if brotli is installed
+        session.headers["Accept-Encoding"] = DEFAULT_ACCEPT_ENCODING
+        session.headers["Connection"] = "keep-alive"
+        return session
+
+    @contextlib.contextmanager
+    def session(self):
+        """
+        Lends an idle session, creating it if none is idle, and waits for
+        one to be returned if all `n_sessions` are in use
+        """
+        with self._slots:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                session = self._create_session()
+
+            try:
+                yield session
+            finally:
+                self._idle.put(session)
+
+    def get(self, url: str, headers: dict = None, params: dict = None) -> requests.Response:
+        with self.session() as session:
+            return session.get(url, headers=headers, params=params, timeout=self.timeout)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_session_pool(service_name: str) -> SessionPool:
+    """
+    Returns the session pool of a service, shared by all its scrapers
+    in the process
+    """
+    with _pools_lock:
+        if service_name not in _pools:
+            _pools[service_name] = SessionPool(**sessions_config)
+        return _pools[service_name]
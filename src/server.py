@@ -0,0 +1,151 @@
+"""
+Preloading server: loads models and scrapers once in a master process, then
+forks uvicorn workers sharing one listening socket. Forked workers share the
+model memory with the master copy-on-write. Before forking, all objects are
+moved to the permanent GC generation (`gc.freeze`), so garbage collection
+in the workers does not write to their headers and unshare the pages.
+The large numpy buffers of the forests are separate from their object
+headers, so refcount changes do not touch them either.
+
+Models reloaded later by a worker are private to that worker.
+
+A worker which exits is restarted with an exponential backoff while it keeps
+failing shortly after start, and the server gives up after
+`--max-failed-restarts` such failures in a row.
+
+Usage (from src/):
+    python server.py --workers 4 --port 8000
+"""
+import gc
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+import argparse
+
+
+_log = logging.getLogger("server")
+
+MIN_WORKER_UPTIME = 10  # a worker exiting sooner failed on startup
+RESTART_BACKOFF_BASE = 1
+RESTART_BACKOFF_MAX = 60
+
+
+def create_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str):
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    gc.enable()
+
+    config = uvicorn.Config(app, log_level=log_level)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    if not server.started:
+        raise RuntimeError("Worker failed to start")
+
+
+def spawn_worker(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            run_worker(app, sock, log_level)
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            _log.exception(f"Worker {os.getpid()} crashed")
+        finally:
+            logging.shutdown()
+            os._exit(exit_code)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with models preloaded before forking")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--max-failed-restarts", type=int, default=5,
+                        help="give up after this many workers in a row failing on startup")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+
+    # Objects created during preloading are never collected in the master,
+    # so the collector is not needed until the workers are forked
+    gc.disable()
+    import main as api
+    api.preload_models()
+    api.preload_scrapers()
+    gc.collect()
+    gc.freeze()
+    _log.info(f"Models preloaded, {gc.get_freeze_count()} objects frozen")
+
+    sock = create_socket(args.host, args.port)
+    workers = {spawn_worker(api.app, sock, args.log_level): time.monotonic()
+               for _ in range(args.workers)}
+    _log.info(f"Started workers {sorted(workers)} on {args.host}:{args.port}")
+
+    stopping = False
+    gave_up = False
+    n_failed_restarts = 0
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started_at = workers.pop(pid, None)
+        if stopping or started_at is None:
+            continue
+
+        exit_code = os.waitstatus_to_exitcode(status)
+        if time.monotonic() - started_at >= MIN_WORKER_UPTIME:
+            n_failed_restarts = 0
+            delay = 0
+        elif n_failed_restarts < args.max_failed_restarts:
+            delay = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** n_failed_restarts)
+            n_failed_restarts += 1
+        else:
+            _log.error(f"Worker {pid} exited with status {exit_code}, {n_failed_restarts} "
+                       f"restarted workers failed on startup in a row, stopping the server")
+            gave_up = True
+            stop(signal.SIGTERM, None)
+            continue
+
+        _log.warning(f"Worker {pid} exited with status {exit_code}, restarting it in {delay} s")
+        time.sleep(delay)
+        if not stopping:
+            workers[spawn_worker(api.app, sock, args.log_level)] = time.monotonic()
+
+    sock.close()
+    sys.exit(1 if gave_up else 0)
+
+
+if __name__ == "__main__":
+    main()
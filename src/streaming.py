@@ -0,0 +1,203 @@
+import io
+import csv
+import json
+import codecs
+import asyncio
+import tempfile
+import itertools
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+
+from fastapi.concurrency import run_in_threadpool
+
+from exceptions import InvalidUpload
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+UPLOAD_MEDIA_TYPES = {"csv": CSV_MEDIA_TYPE, "ndjson": NDJSON_MEDIA_TYPE}
+
+
+def ndjson_line(item: dict) -> bytes:
+    return (json.dumps(item) + "\n").encode()
+
+
+async def stream_as_completed(items: Iterable,
+                              fn: Callable[[object], Awaitable[dict]]) -> AsyncIterator[bytes]:
+    """
+    Runs `fn` concurrently for all items and yields its results as NDJSON
+    lines in completion order. Pending calls are cancelled if the client
+    disconnects.
+    """
+    tasks = [asyncio.ensure_future(fn(item)) for item in items]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield ndjson_line(await task)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def get_upload_format(content_type: str | None) -> str | None:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("text/csv", "application/csv"):
+        return "csv"
+    if media_type in ("application/x-ndjson", "application/jsonl", "application/json-seq"):
+        return "ndjson"
+    return None
+
+
+async def spool_upload(byte_stream: AsyncIterator[bytes],
+                       max_upload_bytes: int,
+                       max_line_bytes: int,
+                       max_memory_bytes: int) -> tempfile.SpooledTemporaryFile:
+    """
+    Reads the whole request body into a temporary file, kept in memory up
+    to `max_memory_bytes` and on disk above it. The body is read before
+    responding, so clients which send the whole upload before reading the
+    response do not deadlock.
+
+    Args:
+        byte_stream (AsyncIterator[bytes]): request body
+        max_upload_bytes (int): max. size of the body
+        max_line_bytes (int): max. length of a line of the body
+        max_memory_bytes (int): size above which the body is moved to disk
+
+    Returns:
+        (SpooledTemporaryFile): binary file with the body, at position 0
+
+    Raises:
+        InvalidUpload: if the body is too large, has a too long line or is
+                       not valid UTF-8
+    """
+    upload = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    n_bytes = 0
+    line_length = 0
+    try:
+        async for chunk in byte_stream:
+            n_bytes += len(chunk)
+            if n_bytes > max_upload_bytes:
+                raise InvalidUpload(f"Upload larger than {max_upload_bytes} bytes",
+                                    status_code=413)
+
+            *lines, last_line = chunk.split(b"\n")
+            if lines:
+                longest = max([line_length + len(lines[0]), *map(len, lines[1:])])
+                if longest > max_line_bytes:
+                    raise InvalidUpload(f"Line longer than {max_line_bytes} bytes",
+                                        status_code=413)
+                line_length = 0
+            line_length += len(last_line)
+            if line_length > max_line_bytes:
+                raise InvalidUpload(f"Line longer than {max_line_bytes} bytes", status_code=413)
+
+            try:
+                decoder.decode(chunk)
+            except UnicodeDecodeError as e:
+                raise InvalidUpload(f"Upload is not valid UTF-8: {e}", status_code=400)
+            upload.write(chunk)
+
+        try:
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            raise InvalidUpload(f"Upload is not valid UTF-8: {e}", status_code=400)
+    except BaseException:
+        upload.close()
+        raise
+
+    upload.seek(0)
+    return upload
+
+
+def _none_if_empty(value: str | None) -> str | None:
+    return value if value != "" else None
+
+
+def iter_upload_items(text_file: io.TextIOBase, file_format: str) -> Iterator:
+    """
+    Yields raw items of a CSV (with a header row) or NDJSON upload. Empty
+    CSV fields, as well as those missing in short rows, become None and
+    values beyond the header are dropped. NDJSON lines which are not valid
+    JSON are yielded as strings and fail validation later. If the CSV
+    cannot be parsed further, InvalidUpload is yielded as the last item.
+    """
+    if file_format == "ndjson":
+        for line in text_file:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield line.rstrip("\r\n")
+        return
+
+    reader = csv.DictReader(text_file)
+    try:
+        for row in reader:
+            yield {column: _none_if_empty(value) for column, value in row.items()
+                   if column is not None}
+    except csv.Error as e:
+        yield InvalidUpload(f"Invalid CSV at line {reader.line_num}: {e}", status_code=400)
+
+
+def get_csv_output_columns(text_file: io.TextIOBase) -> list[str]:
+    """
+    Reads the header of a CSV upload, leaving the file at its start,
+    and returns columns of the scored output
+    """
+    header = next(csv.reader(text_file), [])
+    text_file.seek(0)
+    return header + [column for column in ("result", "message") if column not in header]
+
+
+def _format_scored_chunk(items: list, results: list[dict], file_format: str,
+                         columns: list[str] | None) -> bytes:
+    if file_format == "ndjson":
+        return b"".join(ndjson_line({**item, **result} if isinstance(item, dict)
+                                    else {"input": item, **result})
+                        for item, result in zip(items, results))
+
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=columns, extrasaction="ignore")
+    for item, result in zip(items, results):
+        writer.writerow({**item, "result": result.get("result"),
+                         "message": result.get("message")})
+    return output.getvalue().encode()
+
+
+def _format_csv_header(columns: list[str]) -> bytes:
+    output = io.StringIO()
+    csv.writer(output).writerow(columns)
+    return output.getvalue().encode()
+
+
+async def stream_scored_upload(upload: tempfile.SpooledTemporaryFile, file_format: str,
+                               score_fn: Callable[[list], Awaitable[list[dict]]],
+                               chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Scores a spooled CSV or NDJSON upload in chunks of `chunk_size` rows and
+    streams the scored rows back in the same format. At most one chunk of
+    the input is held in memory at a time. Closes the upload at the end.
+
+    Args:
+        upload (SpooledTemporaryFile): request body, see `spool_upload`
+        file_format (str): "csv" or "ndjson"
+        score_fn (Callable): returns one result dict (with a `result` or
+                             a `message` key) per raw item
+        chunk_size (int): number of rows scored at once
+    """
+    with upload, io.TextIOWrapper(upload, encoding="utf-8", newline="") as text_file:
+        columns = None
+        if file_format == "csv":
+            columns = await run_in_threadpool(get_csv_output_columns, text_file)
+            yield _format_csv_header(columns)
+
+        items = iter_upload_items(text_file, file_format)
+        while chunk := await run_in_threadpool(list, itertools.islice(items, chunk_size)):
+            error = chunk.pop() if isinstance(chunk[-1], InvalidUpload) else None
+            if chunk:
+                results = await score_fn(chunk)
+                yield _format_scored_chunk(chunk, results, file_format, columns)
+            if error is not None:
+                yield _format_scored_chunk([{}], [{"message": str(error)}], file_format, columns)
+                break
@@ -0,0 +1,83 @@
+"""
+Parity of the pandas-free FeatureVectorizer with the fitted sklearn
+preprocessing it replaces.
+
+Usage (from src/):
+    python -m pytest tests
+"""
+import math
+
+import numpy as np
+import pytest
+
+from prediction import records_to_dataframe, get_vectorizer
+from benchmarks.synthetic import make_records, fit_pipeline
+
+
+PROPERTY_TYPES = ["apartments", "houses", "lands"]
+
+
+@pytest.fixture(scope="module", params=PROPERTY_TYPES)
+def property_type(request):
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def pipeline(property_type):
+    return fit_pipeline(property_type, n_samples=500, n_estimators=5, max_depth=10)
+
+
+def sklearn_features(pipeline, records: list[dict]) -> np.ndarray:
+    return pipeline[:-1].transform(records_to_dataframe(records)).astype(np.float64)
+
+
+def assert_same_features(pipeline, records: list[dict]):
+    expected = sklearn_features(pipeline, records)
+    vectorizer = get_vectorizer(pipeline)
+    np.testing.assert_array_equal(vectorizer.transform_records(records), expected)
+    np.testing.assert_array_equal(vectorizer.transform(records_to_dataframe(records)), expected)
+
+
+def test_random_records(property_type, pipeline):
+    assert_same_features(pipeline, make_records(property_type, 300, seed=1))
+
+
+@pytest.mark.parametrize("column", ["province", "subregion", "market", "n_rooms"])
+def test_none_values(property_type, pipeline, column):
+    records = make_records(property_type, 20, seed=2)
+    if column not in records[0]:
+        pytest.skip(f"{property_type} have no {column}")
+    for record in records[::2]:
+        record[column] = None
+    assert_same_features(pipeline, records)
+
+
+@pytest.mark.parametrize("column", ["province", "subregion", "market"])
+def test_unknown_categories(property_type, pipeline, column):
+    records = make_records(property_type, 20, seed=3)
+    if column not in records[0]:
+        pytest.skip(f"{property_type} have no {column}")
+    for record in records[::2]:
+        record[column] = f"unknown-{column}"
+    assert_same_features(pipeline, records)
+
+
+@pytest.mark.parametrize("location", [None, math.nan, "unknown-location"])
+def test_missing_or_unknown_location(property_type, pipeline, location):
+    records = make_records(property_type, 20, seed=4)
+    if "location" not in records[0]:
+        pytest.skip(f"{property_type} have no location")
+    for record in records[::2]:
+        record["location"] = location
+    assert_same_features(pipeline, records)
+
+
+def test_single_record(property_type, pipeline):
+    assert_same_features(pipeline, make_records(property_type, 1, seed=5))
+
+
+def test_empty_input(pipeline):
+    vectorizer = get_vectorizer(pipeline)
+    features = vectorizer.transform_records([])
+    assert features.shape == (0, vectorizer.n_features)
+    assert features.dtype == np.float64
@@ -0,0 +1,108 @@
+import time
+import asyncio
+import threading
+import contextlib
+from urllib.parse import urlsplit
+
+import toml
+import httpx
+
+
+toml_config = toml.load("../src/conf/config.toml")
+http_config = toml_config["http"]
+
+_async_client: httpx.AsyncClient | None = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide async HTTP client. Connections are pooled and
+    kept alive between requests, so repeated requests to the same host
+    skip the TCP and TLS handshakes.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(http_config["timeout"],
+                                  connect=http_config["connect_timeout"]),
+            limits=httpx.Limits(
+                max_connections=http_config["max_connections"],
+                max_keepalive_connections=http_config["max_keepalive_connections"],
+                keepalive_expiry=http_config["keepalive_expiry"]),
+            follow_redirects=True)
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+class HostLimiter:
+    def __init__(self, max_per_host: int):
+        """
+        Caps the number of concurrent requests sent to a single host
+        """
+        self.max_per_host = max_per_host
+        self._semaphores = {}
+
+    @contextlib.asynccontextmanager
+    async def limit(self, url: str):
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+
+        async with semaphore:
+            yield
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """
+        Thread-safe token bucket. Tokens refill at `rate` per second up to
+        `capacity`; a caller without a token reserves the next one and
+        sleeps until it is due, so waiting callers are served in order.
+
+        Args:
+            rate (float): number of tokens added per second
+            capacity (float): max. number of tokens, i.e. the allowed burst
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def set_rate(self, rate: float):
+        """
+        Changes the refill rate. Tokens already reserved keep their due time.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+    def acquire(self) -> float:
+        """
+        Takes a token, blocking until it is available
+
+        Returns:
+            (float): number of seconds waited
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            wait_time = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait_time:
+            time.sleep(wait_time)
+        return wait_time
+
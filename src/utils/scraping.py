@@ -1,14 +1,23 @@
 import json
 import random
+import functools
 from datetime import datetime
 
 
 PATH_TO_HEADERS_CONFIG = "../src/conf/scraping/headers.json"
 
 
-def generate_random_headers():
+@functools.cache
+def load_headers_config() -> dict:
+    """
+    Reads the headers config once per process
+    """
     with open(PATH_TO_HEADERS_CONFIG, "r") as file:
-        headers_config = json.load(file)
+        return json.load(file)
+
+
+def generate_random_headers():
+    headers_config = load_headers_config()
 
     headers_names = headers_config.keys()
     random_headers = dict().fromkeys(headers_names)
@@ -1,21 +1,102 @@
-import io
+import os
+import toml
 import pickle
-from google.cloud import storage
 
+from forest import compile_pipeline
+from artifacts import MANIFEST_NAME, load_artifact
+from model_store import BlobInfo, ModelCache, create_backend
 
-def load_model(property_type):
-    blob_names_dict = {"houses": "gcp_randomforest_hou_240210_MAPE: 0.218.pickle",
-                       "apartments": "gcp_randomforest_apa_240210_MAPE: 0.116.pickle",
-                       "lands": "gcp_randomforest_lan_240210_MAPE: 0.284.pickle"}
 
-    client = storage.Client()
+models_config = toml.load("../src/conf/config.toml")["models"]
 
-    bucket = client.bucket("rea-models")
-    blob = bucket.blob(blob_names_dict[property_type])
-    byte_stream = io.BytesIO()
-    blob.download_to_file(byte_stream)
-    byte_stream.seek(0)
-    return pickle.load(byte_stream)
+BLOB_NAMES = {"houses": "gcp_randomforest_hou_240210_MAPE: 0.218.pickle",
+              "apartments": "gcp_randomforest_apa_240210_MAPE: 0.116.pickle",
+              "lands": "gcp_randomforest_lan_240210_MAPE: 0.284.pickle"}
+
+BLOB_PREFIXES = {"houses": "gcp_randomforest_hou_",
+                 "apartments": "gcp_randomforest_apa_",
+                 "lands": "gcp_randomforest_lan_"}
+
+_model_cache = None
+
+
+def get_model_cache():
+    global _model_cache
+    if _model_cache is None:
+        _model_cache = ModelCache(models_config["cache_dir"],
+                                  create_backend(models_config),
+                                  models_config["verify_cached"])
+    return _model_cache
+
+
+def _get_artifact_path(property_type):
+    if not models_config["artifacts_dir"]:
+        return None
+    artifact_path = os.path.join(models_config["artifacts_dir"], property_type)
+    return artifact_path if os.path.exists(os.path.join(artifact_path, MANIFEST_NAME)) else None
+
+
+def get_model_blob_info(property_type) -> BlobInfo:
+    """
+    Returns the blob of a property type model. With `track_latest` enabled it is
+    the newest blob of that type (names are tagged with the training date).
+    """
+    model_cache = get_model_cache()
+    if models_config["track_latest"]:
+        blobs = model_cache.backend.list_blobs(BLOB_PREFIXES[property_type])
+        if blobs:
+            return max(blobs, key=lambda blob: blob.name)
+    return model_cache.get_blob_info(BLOB_NAMES[property_type])
+
+
+def get_model_version(property_type) -> str:
+    artifact_path = _get_artifact_path(property_type)
+    if artifact_path is not None:
+        mtime = os.stat(os.path.join(artifact_path, MANIFEST_NAME)).st_mtime_ns
+        return f"artifact:{property_type}#{mtime}"
+
+    blob_info = get_model_blob_info(property_type)
+    return f"{blob_info.name}#{blob_info.generation}"
+
+
+def load_versioned_model(property_type, compiled=False):
+    """
+    Loads the current model of a property type along with its version
+    """
+    artifact_path = _get_artifact_path(property_type)
+    if artifact_path is not None:
+        version = get_model_version(property_type)
+        return load_artifact(artifact_path), version
+
+    blob_info = get_model_blob_info(property_type)
+    model_path = get_model_cache().fetch(blob_info.name, blob_info)
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+
+    model = compile_pipeline(model) if compiled else model
+    return model, f"{blob_info.name}#{blob_info.generation}"
+
+
+def load_model(property_type, compiled=False):
+    return load_versioned_model(property_type, compiled)[0]
+
+
+def load_model_version(property_type, version, compiled=False):
+    """
+    Loads a given version of a property type model, as returned
+    by `load_versioned_model`
+    """
+    if version.startswith("artifact:"):
+        if get_model_version(property_type) != version:
+            raise IOError(f"Model version {version} is no longer available")
+        return load_artifact(_get_artifact_path(property_type))
+
+    blob_name, generation = version.rsplit("#", 1)
+    model_path = get_model_cache().fetch_version(blob_name, generation)
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+
+    return compile_pipeline(model) if compiled else model
 
 
 def load_scraper(property_type):